@@ -0,0 +1,48 @@
+import os
+
+from embedding_backends import configured_backend
+
+DEPTH_ENV = "RAG_RETRIEVAL_DEPTH"
+FLOOR_ENV = "RAG_SCORE_FLOOR"
+NO_INFORMATION = "I don't have information about that."
+# hashing is calibrated with retrieval_benchmark.py; openai is provisional until it is measured the same way.
+DEFAULT_SCORE_FLOORS = {"openai": 0.25, "hashing": 0.18}
+
+
+def configured_depth():
+    depth = os.environ.get(DEPTH_ENV, "fixed").strip().lower()
+    if depth not in ("fixed", "adaptive"):
+        raise ValueError(f"Unknown retrieval depth '{depth}' in {DEPTH_ENV} (expected fixed or adaptive)")
+    return depth
+
+
+def score_floor(backend=None):
+    if os.environ.get(FLOOR_ENV):
+        return float(os.environ[FLOOR_ENV])
+    return DEFAULT_SCORE_FLOORS[backend or configured_backend()]
+
+
+def cosine_scores(vector_store, embedding, k, filter=None):
+    hits = vector_store.similarity_search_by_vector_with_relevance_scores(embedding, k=k, filter=filter)
+    return sorted((1.0 - distance / 2.0 for _, distance in hits), reverse=True)
+
+
+class AdaptiveDepth:
+    def __init__(self, min_k=12, max_k=40, floor=None, gap=0.1):
+        self.min_k = min_k
+        self.max_k = max_k
+        self.floor = score_floor() if floor is None else floor
+        self.gap = gap
+
+    def cut(self, scores):
+        if not scores or scores[0] < self.floor:
+            return 0
+        depth = len(scores)
+        for i, score in enumerate(scores):
+            if score < self.floor or scores[0] - score > self.gap:
+                depth = i
+                break
+        return max(self.min_k, min(depth, self.max_k))
+
+    def depth(self, vector_store, embedding, filter=None):
+        return self.cut(cosine_scores(vector_store, embedding, self.max_k, filter))
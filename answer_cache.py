@@ -0,0 +1,238 @@
+import asyncio
+import atexit
+import json
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.runnables import Runnable
+from langchain_core.runnables.config import merge_configs
+
+from course_lookup import find_codes, find_departments
+from course_table import ORDINALS, TYPE_WORDS
+from rag_metrics import record, stage
+
+CACHE_FILE = "./answer_cache.json"
+CACHEABLE_SOURCES = {"primary", "hedge", "retry"}
+QUALIFIER_WORDS = set(ORDINALS) | set(TYPE_WORDS) | {"fall", "spring", "not", "without", "prerequisite", "prerequisites", "ects"}
+
+
+def normalize_question(question):
+    return re.sub(r"\s+", " ", re.sub(r"[^\w\s]", " ", question.lower())).strip()
+
+
+def question_signature(question):
+    qualifiers = sorted(set(normalize_question(question).split()) & QUALIFIER_WORDS)
+    return [sorted(find_codes(question)), sorted(find_departments(question)),
+            sorted(re.findall(r"\d+", question)), qualifiers]
+
+
+class AnswerCache:
+    def __init__(self, embeddings, version, path=CACHE_FILE, max_entries=500, similarity_threshold=0.95,
+                 save_every=20, save_interval=30.0):
+        self.embeddings = embeddings
+        self.version = version
+        self.path = path
+        self.vectors_path = os.path.splitext(path)[0] + ".vectors.npy" if path else None
+        self.max_entries = max_entries
+        self.similarity_threshold = similarity_threshold
+        self.save_every = save_every
+        self.save_interval = save_interval
+        self.lock = threading.Lock()
+        self.entries = OrderedDict()
+        self.unsaved = 0
+        self.saved_at = time.monotonic()
+        self.stats = {"lookups": 0, "exact_hits": 0, "semantic_hits": 0, "misses": 0, "skipped": 0, "latency_saved": 0.0}
+
+        if path and os.path.exists(path) and os.path.exists(self.vectors_path):
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    stored = json.load(f)
+                vectors = np.load(self.vectors_path)
+            except ValueError:
+                stored, vectors = {}, []
+            entries = stored.get("entries", [])
+            if stored.get("version") == version and len(entries) == len(vectors):
+                for entry, vector in zip(entries, vectors):
+                    entry["vector"] = vector.astype(np.float32)
+                    self.entries[entry["key"]] = entry
+        atexit.register(self.flush)
+
+    def save(self):
+        self.unsaved = 0
+        self.saved_at = time.monotonic()
+        if not self.path:
+            return
+        entries = list(self.entries.values())
+        vectors = np.stack([e["vector"] for e in entries]) if entries else np.zeros((0, 0), dtype=np.float32)
+        tmp_vectors = self.vectors_path + ".tmp.npy"
+        np.save(tmp_vectors, vectors)
+        os.replace(tmp_vectors, self.vectors_path)
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"version": self.version, "entries": [{k: v for k, v in e.items() if k != "vector"} for e in entries]},
+                      f, ensure_ascii=False)
+        os.replace(tmp_path, self.path)
+
+    def flush(self):
+        with self.lock:
+            if self.unsaved:
+                self.save()
+
+    def embed(self, question):
+        vector = np.asarray(self.embeddings.embed_query(question), dtype=np.float32)
+        return vector / (np.linalg.norm(vector) or 1.0)
+
+    def get(self, question):
+        with stage("answer_cache"):
+            answer = self.lookup(question)
+        if answer is not None:
+            record("route", "answer_cache")
+        return answer
+
+    def lookup(self, question):
+        key = normalize_question(question)
+        with self.lock:
+            self.stats["lookups"] += 1
+            entry = self.entries.get(key)
+            if entry:
+                self.entries.move_to_end(key)
+                self.stats["exact_hits"] += 1
+                self.stats["latency_saved"] += entry["latency"]
+                return entry["answer"]
+            candidates = list(self.entries.values())
+
+        if candidates:
+            vector = self.embed(question)
+            matrix = np.stack([e["vector"] for e in candidates])
+            similarities = matrix @ vector
+            best = int(np.argmax(similarities))
+            entry = candidates[best]
+            if similarities[best] >= self.similarity_threshold and entry["signature"] == question_signature(question):
+                with self.lock:
+                    if entry["key"] in self.entries:
+                        self.entries.move_to_end(entry["key"])
+                    self.stats["semantic_hits"] += 1
+                    self.stats["latency_saved"] += entry["latency"]
+                return entry["answer"]
+
+        with self.lock:
+            self.stats["misses"] += 1
+        return None
+
+    def put(self, question, answer, latency):
+        key = normalize_question(question)
+        entry = {
+            "key": key,
+            "question": question,
+            "answer": answer,
+            "latency": latency,
+            "signature": question_signature(question),
+            "vector": self.embed(question)
+        }
+        with self.lock:
+            self.entries[key] = entry
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+            self.unsaved += 1
+            if self.unsaved >= self.save_every or time.monotonic() - self.saved_at >= self.save_interval:
+                self.save()
+
+    def cache_stats(self):
+        s = dict(self.stats)
+        hits = s["exact_hits"] + s["semantic_hits"]
+        s["hit_rate"] = hits / s["lookups"] if s["lookups"] else 0.0
+        s["entries"] = len(self.entries)
+        return s
+
+    def skip(self, source):
+        with self.lock:
+            self.stats["skipped"] += 1
+        record("answer_cache_skipped", source)
+
+    def report(self):
+        s = self.cache_stats()
+        print(f"Answer cache: {s['entries']} entries, {s['exact_hits']} exact + {s['semantic_hits']} semantic hits "
+              f"of {s['lookups']} lookups (hit rate {s['hit_rate']:.0%}), {s['latency_saved']:.1f}s saved, "
+              f"{s['skipped']} fallback answers not stored")
+
+
+class SourceCallback(BaseCallbackHandler):
+    def __init__(self):
+        self.sources = []
+
+    def on_llm_end(self, response, **kwargs):
+        for generations in response.generations:
+            for g in generations:
+                metadata = getattr(getattr(g, "message", None), "response_metadata", None) or {}
+                self.sources.append(metadata.get("llm_source", "primary"))
+
+    def cacheable(self):
+        return all(source in CACHEABLE_SOURCES for source in self.sources)
+
+
+class CachedAnswerChain(Runnable):
+    def __init__(self, chain, cache):
+        self.chain = chain
+        self.cache = cache
+
+    def watch(self, config):
+        sources = SourceCallback()
+        return sources, merge_configs(config, {"callbacks": [sources]})
+
+    def store(self, sources, question, answer, elapsed):
+        if sources.cacheable():
+            self.cache.put(question, answer, elapsed)
+        else:
+            self.cache.skip(next(s for s in sources.sources if s not in CACHEABLE_SOURCES))
+
+    def invoke(self, question, config=None, **kwargs):
+        answer = self.cache.get(question)
+        if answer is not None:
+            return answer
+        start = time.perf_counter()
+        sources, config = self.watch(config)
+        answer = self.chain.invoke(question, config, **kwargs)
+        self.store(sources, question, answer, time.perf_counter() - start)
+        return answer
+
+    async def ainvoke(self, question, config=None, **kwargs):
+        answer = await asyncio.to_thread(self.cache.get, question)
+        if answer is not None:
+            return answer
+        start = time.perf_counter()
+        sources, config = self.watch(config)
+        answer = await self.chain.ainvoke(question, config, **kwargs)
+        await asyncio.to_thread(self.store, sources, question, answer, time.perf_counter() - start)
+        return answer
+
+    def stream(self, question, config=None, **kwargs):
+        answer = self.cache.get(question)
+        if answer is not None:
+            yield answer
+            return
+        start = time.perf_counter()
+        sources, config = self.watch(config)
+        parts = []
+        for chunk in self.chain.stream(question, config, **kwargs):
+            parts.append(chunk)
+            yield chunk
+        self.store(sources, question, "".join(parts), time.perf_counter() - start)
+
+    async def astream(self, question, config=None, **kwargs):
+        answer = await asyncio.to_thread(self.cache.get, question)
+        if answer is not None:
+            yield answer
+            return
+        start = time.perf_counter()
+        sources, config = self.watch(config)
+        parts = []
+        async for chunk in self.chain.astream(question, config, **kwargs):
+            parts.append(chunk)
+            yield chunk
+        await asyncio.to_thread(self.store, sources, question, "".join(parts), time.perf_counter() - start)
@@ -0,0 +1,165 @@
+import json
+import math
+import os
+import re
+import threading
+from collections import Counter, OrderedDict
+
+import numpy as np
+from langchain_core.documents import Document
+
+from rag_metrics import stage
+
+TOKEN_PATTERN = re.compile(r"\w+", re.UNICODE)
+STOPWORDS = {
+    "a", "an", "and", "are", "as", "at", "be", "by", "do", "does", "for", "from", "in", "is", "it",
+    "of", "on", "or", "that", "the", "their", "there", "this", "to", "what", "which", "with", "any",
+    "course", "courses", "department", "departments"
+}
+
+
+def tokenize(text):
+    return [t for t in TOKEN_PATTERN.findall(text.lower()) if t not in STOPWORDS]
+
+
+class BM25Index:
+    def __init__(self, ids, texts, metadatas, k1=1.5, b=0.75):
+        self.ids = ids
+        self.texts = texts
+        self.metadatas = metadatas
+        self.k1 = k1
+        self.b = b
+        self.masks = {}
+
+        postings = {}
+        lengths = []
+        for i, text in enumerate(texts):
+            terms = Counter(tokenize(text))
+            lengths.append(sum(terms.values()))
+            for term, tf in terms.items():
+                postings.setdefault(term, ([], []))
+                postings[term][0].append(i)
+                postings[term][1].append(tf)
+
+        self.doc_len = np.array(lengths, dtype=np.float32)
+        self.avgdl = float(self.doc_len.mean()) if len(lengths) else 0.0
+        n = len(texts)
+        self.postings = {}
+        for term, (docs, tfs) in postings.items():
+            idf = math.log(1 + (n - len(docs) + 0.5) / (len(docs) + 0.5))
+            self.postings[term] = (np.array(docs, dtype=np.int32), np.array(tfs, dtype=np.float32), idf)
+
+    @classmethod
+    def from_documents(cls, documents, ids):
+        return cls(list(ids), [d.page_content for d in documents], [d.metadata for d in documents])
+
+    @classmethod
+    def load(cls, path):
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        return cls(data["ids"], data["texts"], data["metadatas"], data.get("k1", 1.5), data.get("b", 0.75))
+
+    def save(self, path):
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"ids": self.ids, "texts": self.texts, "metadatas": self.metadatas,
+                       "k1": self.k1, "b": self.b}, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+
+    def scores(self, query):
+        scores = np.zeros(len(self.ids), dtype=np.float32)
+        norm = self.k1 * (1 - self.b + self.b * self.doc_len / (self.avgdl or 1.0))
+        for term in set(tokenize(query)):
+            if term not in self.postings:
+                continue
+            docs, tfs, idf = self.postings[term]
+            scores[docs] += idf * tfs * (self.k1 + 1) / (tfs + norm[docs])
+        return scores
+
+    def mask(self, filter):
+        key = json.dumps(filter, sort_keys=True)
+        if key not in self.masks:
+            self.masks[key] = np.array([all((meta or {}).get(field) == value for field, value in filter.items())
+                                        for meta in self.metadatas], dtype=bool)
+        return self.masks[key]
+
+    def search(self, query, k=20, filter=None):
+        scores = self.scores(query)
+        if filter:
+            scores = np.where(self.mask(filter), scores, 0.0)
+        top = np.argsort(-scores, kind="stable")[:k]
+        return [(int(i), float(scores[i])) for i in top if scores[i] > 0]
+
+    def document(self, i):
+        return Document(id=self.ids[i], page_content=self.texts[i], metadata=self.metadatas[i])
+
+
+def reciprocal_rank_fusion(rankings, k=60):
+    fused = {}
+    for ranking in rankings:
+        for rank, doc_id in enumerate(ranking):
+            fused[doc_id] = fused.get(doc_id, 0.0) + 1.0 / (k + rank + 1)
+    return sorted(fused, key=fused.get, reverse=True)
+
+
+def search_by_vectors(vector_store, vectors, k):
+    if hasattr(vector_store, "similarity_search_by_vectors"):
+        return vector_store.similarity_search_by_vectors(vectors, k=k)
+    return [vector_store.similarity_search_by_vector(vector, k=k) for vector in vectors]
+
+
+class HybridRetriever:
+    def __init__(self, vector_store, bm25, k=20, fetch_k=40, rrf_k=60, max_prefetched=1024):
+        self.vector_store = vector_store
+        self.bm25 = bm25
+        self.k = k
+        self.fetch_k = fetch_k
+        self.rrf_k = rrf_k
+        self.max_prefetched = max_prefetched
+        self.positions = {doc_id: i for i, doc_id in enumerate(bm25.ids)}
+        self.prefetched = OrderedDict()
+        self.lock = threading.Lock()
+
+    def prefetch(self, questions):
+        questions = [q for q in dict.fromkeys(questions) if q not in self.prefetched]
+        if not questions:
+            return
+        vectors = self.vector_store.embeddings.embed_documents(questions)
+        results = search_by_vectors(self.vector_store, vectors, self.fetch_k)
+        fused = [self.fuse(q, docs) for q, docs in zip(questions, results)]
+        with self.lock:
+            for q, docs in zip(questions, fused):
+                self.prefetched[q] = docs
+            while len(self.prefetched) > self.max_prefetched:
+                self.prefetched.popitem(last=False)
+
+    def invoke(self, question):
+        with self.lock:
+            prefetched = self.prefetched.pop(question, None)
+        if prefetched is not None:
+            return prefetched
+
+        return self.search(question)
+
+    def search(self, question, embedding=None, filter=None, k=None):
+        if embedding is None:
+            with stage("embed_query"):
+                embedding = self.vector_store.embeddings.embed_query(question)
+        with stage("vector_search"):
+            vector_docs = self.vector_store.similarity_search_by_vector(embedding, k=self.fetch_k, filter=filter)
+        return self.fuse(question, vector_docs, filter, k)
+
+    def fuse(self, question, vector_docs, filter=None, k=None):
+        with stage("bm25_search"):
+            keyword_hits = self.bm25.search(question, k=self.fetch_k, filter=filter)
+
+        by_id = {}
+        vector_ranking = []
+        for doc in vector_docs:
+            doc_id = doc.id or doc.metadata.get('code')
+            by_id.setdefault(doc_id, doc)
+            vector_ranking.append(doc_id)
+        keyword_ranking = [self.bm25.ids[i] for i, _ in keyword_hits]
+
+        fused = reciprocal_rank_fusion([vector_ranking, keyword_ranking], k=self.rrf_k)[:k or self.k]
+        return [by_id[doc_id] if doc_id in by_id else self.bm25.document(self.positions[doc_id]) for doc_id in fused]
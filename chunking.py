@@ -0,0 +1,153 @@
+import hashlib
+import json
+from collections import OrderedDict
+
+from langchain_core.documents import Document
+
+from web_scraping import departments
+
+DEPARTMENT_CODES = {dept["name"]: dept["code"] for dept in departments}
+DIFF_FIELDS = {"course_name": "Name", "prerequisites": "Prerequisites", "ects": "ECTS",
+               "description": "Desc", "weekly_topics": "Topics"}
+WEEKS_PER_CHUNK = 4
+EMPTY_VALUES = {"", "Not specified", "None", "[]"}
+
+
+def department_flag(department):
+    return f"dept_{DEPARTMENT_CODES.get(department, department)}"
+
+
+def entity_id(entity):
+    return entity.get('course_code', 'Unknown')
+
+
+def offered_by(entity):
+    return "; ".join(f"{m.get('department', '')} ({m.get('semester', '')}, {m.get('type', '')})" for m in entity.get('memberships', []))
+
+
+def differences(entity):
+    found = []
+    for m in entity.get('memberships', []):
+        for field, value in m.get('overrides', {}).items():
+            if field in DIFF_FIELDS:
+                found.append(f"{m.get('department', '')}: {DIFF_FIELDS[field]} {value}")
+    return found
+
+
+def entity_metadata(entity):
+    members = entity.get('memberships', [])
+    meta = {
+        "code": entity.get('course_code', 'Unknown'),
+        "departments": "; ".join(m.get('department', '') for m in members)
+    }
+    for m in members:
+        meta[department_flag(m.get('department', 'Unknown'))] = True
+    return meta
+
+
+def hashed_document(doc_id, content, meta):
+    meta["content_hash"] = hashlib.sha256((content + json.dumps(meta, sort_keys=True)).encode("utf-8")).hexdigest()
+    return Document(id=doc_id, page_content=content, metadata=meta)
+
+
+def entity_header(entity):
+    return (
+        f"Code: {entity.get('course_code', '')}\n"
+        f"Name: {entity.get('course_name', '')}\n"
+    )
+
+
+def entity_document(entity):
+    content = (
+        entity_header(entity)
+        + f"Offered by: {offered_by(entity)}\n"
+        f"Prerequisites: {entity.get('prerequisites', '')}\n"
+        f"ECTS: {entity.get('ects', '')}\n"
+        f"Desc: {entity.get('description', '')}\n"
+        f"Topics: {entity.get('weekly_topics', '')}"
+    )
+    found = differences(entity)
+    if found:
+        content += "\nDifferences: " + "; ".join(found)
+    return hashed_document(entity_id(entity), content, entity_metadata(entity))
+
+
+def entity_documents(entities):
+    return {entity_id(e): entity_document(e) for e in entities}
+
+
+def week_groups(entity, size=WEEKS_PER_CHUNK):
+    topics = entity.get('weekly_topics') or []
+    if not isinstance(topics, list):
+        topics = [str(topics)]
+    return [(start + 1, min(start + size, len(topics)), topics[start:start + size]) for start in range(0, len(topics), size)]
+
+
+def entity_chunks(entity):
+    parent = entity_id(entity)
+    overview = entity_header(entity) + f"Offered by: {offered_by(entity)}\nPrerequisites: {entity.get('prerequisites', '')}\nECTS: {entity.get('ects', '')}"
+    found = differences(entity)
+    if found:
+        overview += "\nDifferences: " + "; ".join(found)
+    sections = [("overview", 0, 0, overview)]
+    for field, label in [("objectives", "Objectives"), ("description", "Desc")]:
+        value = str(entity.get(field) or "").strip()
+        if value not in EMPTY_VALUES:
+            sections.append((field, 0, 0, entity_header(entity) + f"{label}: {value}"))
+    for first, last, topics in week_groups(entity):
+        sections.append(("weeks", first, last, entity_header(entity) + "Topics: " + "; ".join(str(t) for t in topics)))
+
+    chunks = []
+    for section, first, last, content in sections:
+        meta = entity_metadata(entity)
+        meta.update({"parent": parent, "section": section, "week_start": first, "week_end": last})
+        suffix = f"weeks-{first}-{last}" if section == "weeks" else section
+        chunks.append(hashed_document(f"{parent}#{suffix}", content, meta))
+    return chunks
+
+
+def chunk_documents(entities):
+    return {doc.id: doc for entity in entities for doc in entity_chunks(entity)}
+
+
+def parent_summary(entity, chunks):
+    sections = {c.metadata.get("section") for c in chunks}
+    weeks = sorted((c.metadata.get("week_start", 0), c.metadata.get("week_end", 0)) for c in chunks if c.metadata.get("section") == "weeks")
+    topics = entity.get('weekly_topics') or []
+
+    lines = [
+        f"Code: {entity.get('course_code', '')}",
+        f"Name: {entity.get('course_name', '')}",
+        f"Offered by: {offered_by(entity)}",
+        f"Prerequisites: {entity.get('prerequisites', '')}",
+        f"ECTS: {entity.get('ects', '')}",
+        f"Desc: {entity.get('description', '')}"
+    ]
+    if "objectives" in sections:
+        lines.append(f"Objectives: {entity.get('objectives', '')}")
+    if weeks and isinstance(topics, list):
+        lines.append(f"Topics: {[t for first, last in weeks for t in topics[first - 1:last]]}")
+    found = differences(entity)
+    if found:
+        lines.append("Differences: " + "; ".join(found))
+    return Document(id=entity_id(entity), page_content="\n".join(lines), metadata=entity_metadata(entity))
+
+
+class ParentExpander:
+    def __init__(self, entities, max_parents=10):
+        self.entities = {entity_id(e): e for e in entities}
+        self.max_parents = max_parents
+
+    def expand(self, chunks, max_parents=None):
+        limit = max_parents or self.max_parents
+        matched = OrderedDict()
+        for chunk in chunks:
+            parent = chunk.metadata.get("parent", chunk.metadata.get("code"))
+            if parent not in self.entities:
+                continue
+            if parent not in matched:
+                if len(matched) >= limit:
+                    continue
+                matched[parent] = []
+            matched[parent].append(chunk)
+        return [parent_summary(self.entities[parent], found) for parent, found in matched.items()]
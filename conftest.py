@@ -0,0 +1 @@
+collect_ignore = ["test_runner.py"]
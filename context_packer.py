@@ -0,0 +1,123 @@
+import ast
+import logging
+import re
+
+from embedding_scheduler import token_counter
+
+logger = logging.getLogger("rag")
+
+FIELDS = ["Code", "Name", "Offered by", "Semester", "Dept", "Type", "Prerequisites", "ECTS", "Desc", "Objectives", "Topics", "Differences"]
+MEMBERSHIP_FIELDS = ["Semester", "Dept", "Type"]
+
+ECTS_PATTERN = re.compile(r"\bects\b|credit", re.IGNORECASE)
+PREREQUISITE_PATTERN = re.compile(r"prerequisite|before taking|need to take|required before|unlock", re.IGNORECASE)
+TOPIC_PATTERN = re.compile(r"topic|week|syllabus|cover|include|about|related|focus|discuss|teach|content|description|objective", re.IGNORECASE)
+LISTING_PATTERN = re.compile(r"semester|\byear\b", re.IGNORECASE)
+FILLER_TOPIC_PATTERN = re.compile(r"^Week \d+: Review of the Semester$")
+
+
+def parse_entry(text):
+    fields = {}
+    current = None
+    for line in text.split("\n"):
+        key, sep, value = line.partition(": ")
+        if sep and key in FIELDS:
+            current = key
+            fields[key] = value
+        elif current:
+            fields[current] += "\n" + line
+    return fields
+
+
+def compact_topics(value):
+    try:
+        topics = ast.literal_eval(value)
+    except (ValueError, SyntaxError):
+        return value
+    if not isinstance(topics, list):
+        return value
+    kept = [t for t in topics if not FILLER_TOPIC_PATTERN.match(str(t))]
+    return "; ".join(str(t) for t in kept) or "Not specified"
+
+
+def dropped_fields(question):
+    if TOPIC_PATTERN.search(question):
+        return set()
+    if ECTS_PATTERN.search(question):
+        return {"Desc", "Objectives", "Topics", "Prerequisites"}
+    if PREREQUISITE_PATTERN.search(question):
+        return {"Topics"}
+    if LISTING_PATTERN.search(question):
+        return {"Desc", "Objectives", "Topics"}
+    return set()
+
+
+class ContextPacker:
+    def __init__(self, max_tokens=6000, separator="\n--- COURSE ENTRY ---\n"):
+        self.max_tokens = max_tokens
+        self.separator = separator
+        self.count_tokens = token_counter()
+        self.last_stats = {}
+
+    def merge(self, docs):
+        entries = {}
+        for doc in docs:
+            fields = parse_entry(doc.page_content)
+            if "Code" not in fields:
+                fields = {"Text": doc.page_content}
+            key = tuple((k, v) for k, v in fields.items() if k not in MEMBERSHIP_FIELDS)
+            entry = entries.setdefault(key, {"fields": fields, "members": []})
+            member = tuple(fields.get(k, "") for k in MEMBERSHIP_FIELDS)
+            if member not in entry["members"]:
+                entry["members"].append(member)
+        return list(entries.values())
+
+    def render(self, entry, dropped):
+        fields = entry["fields"]
+        if "Text" in fields:
+            return fields["Text"]
+
+        lines = []
+        for key in FIELDS:
+            if key in dropped or key not in fields:
+                continue
+            if key in MEMBERSHIP_FIELDS:
+                if len(entry["members"]) > 1:
+                    if key == "Dept":
+                        offered = "; ".join(f"{dept} ({semester}, {type_})" for semester, dept, type_ in entry["members"])
+                        lines.append(f"Offered by: {offered}")
+                    continue
+            value = compact_topics(fields[key]) if key == "Topics" else fields[key]
+            lines.append(f"{key}: {value}")
+        return "\n".join(lines)
+
+    def pack(self, question, docs, max_tokens=None):
+        max_tokens = max_tokens or self.max_tokens
+        dropped = dropped_fields(question)
+        blocks = []
+        packed_tokens = 0
+        dropped_tokens = 0
+        skipped = 0
+        separator_tokens = self.count_tokens(self.separator)
+
+        for entry in self.merge(docs):
+            block = self.render(entry, dropped)
+            tokens = self.count_tokens(block) + (separator_tokens if blocks else 0)
+            if packed_tokens + tokens > max_tokens:
+                dropped_tokens += tokens
+                skipped += 1
+                continue
+            blocks.append(block)
+            packed_tokens += tokens
+
+        self.last_stats = {
+            "documents": len(docs),
+            "entries": len(blocks),
+            "dropped_entries": skipped,
+            "packed_tokens": packed_tokens,
+            "dropped_tokens": dropped_tokens,
+            "trimmed_fields": sorted(dropped)
+        }
+        logger.info("context packed=%d tokens dropped=%d tokens (%d docs -> %d entries, %d dropped, trimmed %s)",
+                    packed_tokens, dropped_tokens, len(docs), len(blocks), skipped, ",".join(sorted(dropped)) or "-")
+        return self.separator.join(blocks)
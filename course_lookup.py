@@ -0,0 +1,69 @@
+import json
+import re
+
+from chunking import entity_documents
+from prepare_data import normalize_courses
+from web_scraping import departments
+
+CODE_PATTERN = re.compile(r"\b([A-Z]{2,5})\s?(\d{3,4})((?:\s?/\s?\d{3,4})*)\b")
+
+DEPARTMENT_KEYWORDS = {
+    "SE": ["software engineering"],
+    "CE": ["computer engineering"],
+    "EEE": ["electrical", "electronics"],
+    "IE": ["industrial engineering"]
+}
+
+
+def normalize_code(code):
+    return re.sub(r"\s+", " ", code.strip().upper())
+
+
+def find_codes(question):
+    codes = []
+    for prefix, number, more in CODE_PATTERN.findall(question.upper()):
+        for n in [number] + re.findall(r"\d{3,4}", more):
+            code = f"{prefix} {n}"
+            if code not in codes:
+                codes.append(code)
+    return codes
+
+
+def find_departments(question):
+    lowered = question.lower()
+    found = []
+    for dept in departments:
+        keywords = [dept["name"].lower()] + DEPARTMENT_KEYWORDS.get(dept["code"], [])
+        if any(k in lowered for k in keywords) or re.search(rf"\b{dept['code']}\b(?!\s?\d)", question):
+            found.append(dept["name"])
+    return found
+
+
+class CourseLookup:
+    def __init__(self, courses):
+        self.by_code = {}
+        for course in courses:
+            self.by_code.setdefault(normalize_code(course.get("course_code", "")), []).append(course)
+        self.documents = entity_documents(normalize_courses(courses))
+
+    @classmethod
+    def from_file(cls, path):
+        with open(path, "r", encoding="utf-8") as f:
+            return cls(json.load(f))
+
+    def find_courses(self, question):
+        codes = [code for code in find_codes(question) if code in self.by_code]
+        if not codes:
+            return []
+
+        depts = find_departments(question)
+        found = []
+        for code in codes:
+            matches = self.by_code[code]
+            scoped = [c for c in matches if c["department"] in depts]
+            found.extend(scoped or matches)
+        return found
+
+    def find(self, question):
+        codes = dict.fromkeys(course.get("course_code", "Unknown") for course in self.find_courses(question))
+        return [self.documents[code] for code in codes]
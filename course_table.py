@@ -0,0 +1,182 @@
+import json
+import re
+
+import numpy as np
+
+from course_lookup import find_departments
+
+SEMESTER_PATTERN = re.compile(r"(\d)\.\s*Year\s*(Fall|Spring)", re.IGNORECASE)
+YEAR_TERM_PATTERN = re.compile(r"\b(\d|first|second|third|fourth)(?:st|nd|rd|th|\.)?\s*year\s*(fall|spring)", re.IGNORECASE)
+NTH_SEMESTER_PATTERN = re.compile(r"\b(\d|first|second|third|fourth|fifth|sixth|seventh|eighth)(?:st|nd|rd|th|\.)?\s*semester", re.IGNORECASE)
+AGGREGATE_PATTERN = re.compile(r"\b(how many|total|sum|number of|count|highest|lowest|most|least|average)\b", re.IGNORECASE)
+QUOTED_PATTERN = re.compile(r"['\"‘’“”]([^'\"‘’“”]{2,60})['\"‘’“”]")
+UNMODELLED_PATTERN = re.compile(r"\b(not|no|non|none|without|except|excluding|other than|prerequisites?|requires?|topics?|weekly|"
+                                r"cover(?:s|ing)?|includes?|including|about|discuss(?:es)?|mentions?|teach(?:es)?|"
+                                r"description|objectives?|related)\b|n't\b", re.IGNORECASE)
+
+ORDINALS = {"first": 1, "second": 2, "third": 3, "fourth": 4, "fifth": 5, "sixth": 6, "seventh": 7, "eighth": 8}
+SUBJECT_PREFIXES = {"physics": "PHYS", "math": "MATH", "mathematics": "MATH", "calculus": "MATH",
+                    "chemistry": "CHEM", "history": "HIST", "turkish": "TURK", "english": "ENG"}
+NAME_SYNONYMS = {"internship": "summer training", "summer practice": "summer training"}
+TYPE_WORDS = {"elective": ["Elective", "Elective - Placeholder"],
+              "mandatory": ["Mandatory"],
+              "compulsory": ["Mandatory"],
+              "pool": ["Mandatory - Pool Selection"]}
+DEPARTMENT_CODES = {"SE", "CE", "IE", "EEE", "ELEC"}
+MAX_LISTED_ROWS = 60
+
+
+def ordinal(word):
+    return int(word) if word.isdigit() else ORDINALS[word.lower()]
+
+
+class CourseTable:
+    def __init__(self, courses):
+        self.code = np.array([c.get("course_code", "") for c in courses], dtype=str)
+        self.name = np.array([c.get("course_name", "") for c in courses], dtype=str)
+        self.dept = np.array([c.get("department", "") for c in courses], dtype=str)
+        self.semester = np.array([c.get("semester", "") for c in courses], dtype=str)
+        self.type = np.array([c.get("type", "") for c in courses], dtype=str)
+        self.prefix = np.array([(c.get("course_code", "").split() or [""])[0].upper() for c in courses], dtype=str)
+
+        years, terms, ects, weeks = [], [], [], []
+        for c in courses:
+            match = SEMESTER_PATTERN.search(c.get("semester", ""))
+            years.append(int(match.group(1)) if match else 0)
+            terms.append(match.group(2).title() if match else "")
+            value = str(c.get("ects", "")).strip()
+            ects.append(float(value) if re.fullmatch(r"\d+(\.\d+)?", value) else np.nan)
+            weeks.append(sum(1 for t in c.get("weekly_topics", []) if t.startswith("Week ")))
+        self.year = np.array(years, dtype=np.int8)
+        self.term = np.array(terms, dtype=str)
+        self.ects = np.array(ects, dtype=np.float32)
+        self.weeks = np.array(weeks, dtype=np.int16)
+        self.name_lower = np.char.lower(self.name)
+        self.prefixes = set(self.prefix.tolist())
+
+    @classmethod
+    def from_file(cls, path):
+        with open(path, "r", encoding="utf-8") as f:
+            return cls(json.load(f))
+
+    def mask(self, dept=None, year=None, term=None, types=None, prefix=None, name=None):
+        m = np.ones(len(self.code), dtype=bool)
+        if dept:
+            m &= np.isin(self.dept, dept)
+        if year:
+            m &= self.year == year
+        if term:
+            m &= self.term == term
+        if types:
+            m &= np.isin(self.type, types)
+        if prefix:
+            m &= self.prefix == prefix
+        if name:
+            m &= np.char.find(self.name_lower, name.lower()) >= 0
+        return m
+
+    def count(self, m):
+        return int(m.sum())
+
+    def distinct(self, m):
+        return len(np.unique(self.code[m]))
+
+    def total(self, column, m):
+        return float(np.nansum(getattr(self, column)[m]))
+
+    def group_by(self, column, m, value=None):
+        keys = getattr(self, column)[m]
+        if value is None:
+            groups, counts = np.unique(keys, return_counts=True)
+            result = dict(zip(groups.tolist(), counts.tolist()))
+        else:
+            values = getattr(self, value)[m]
+            result = {k: float(np.nansum(values[keys == k])) for k in np.unique(keys).tolist()}
+        return sorted(result.items(), key=lambda kv: kv[1], reverse=True)
+
+    def parse_query(self, question):
+        if UNMODELLED_PATTERN.search(question):
+            return None
+        lowered = question.lower()
+        filters = {}
+
+        depts = find_departments(question)
+        if depts:
+            filters["dept"] = depts
+
+        match = YEAR_TERM_PATTERN.search(question)
+        if match:
+            filters["year"] = ordinal(match.group(1))
+            filters["term"] = match.group(2).title()
+        else:
+            match = NTH_SEMESTER_PATTERN.search(question)
+            if match:
+                n = ordinal(match.group(1))
+                filters["year"] = (n + 1) // 2
+                filters["term"] = "Fall" if n % 2 else "Spring"
+
+        types = [t for word, mapped in TYPE_WORDS.items() if re.search(rf"\b{word}\b", lowered) for t in mapped]
+        if types:
+            filters["types"] = types
+
+        quoted = [q.strip() for q in QUOTED_PATTERN.findall(question)]
+        for phrase in quoted:
+            if phrase.lower() in TYPE_WORDS:
+                continue
+            if phrase.upper() in self.prefixes:
+                filters["prefix"] = phrase.upper()
+            elif (np.char.find(self.name_lower, phrase.lower()) >= 0).any():
+                filters["name"] = phrase
+            else:
+                return None
+
+        if "prefix" not in filters:
+            for word in re.findall(r"\b[A-Z]{2,5}\b", question):
+                if word in self.prefixes and word not in DEPARTMENT_CODES:
+                    filters["prefix"] = word
+            for word, prefix in SUBJECT_PREFIXES.items():
+                if re.search(rf"\b{word}\b", lowered):
+                    filters["prefix"] = prefix
+
+        if "name" not in filters:
+            for word, name in NAME_SYNONYMS.items():
+                if word in lowered:
+                    filters["name"] = name
+
+        aggregate = AGGREGATE_PATTERN.search(question)
+        listing = "year" in filters and "dept" in filters
+        if not (aggregate or listing) or not filters:
+            return None
+        return filters
+
+    def answer(self, question):
+        filters = self.parse_query(question)
+        if filters is None:
+            return None
+
+        m = self.mask(**filters)
+        lines = ["Structured result computed over the full course table (not a sample):"]
+        described = []
+        for key, value in filters.items():
+            described.append(f"{key}={', '.join(value) if isinstance(value, list) else value}")
+        lines.append("Filters: " + "; ".join(described))
+        lines.append(f"Matching rows: {self.count(m)} ({self.distinct(m)} distinct course codes)")
+        lines.append(f"Total ECTS: {self.total('ects', m):g}")
+
+        lines.append("Count by type: " + ", ".join(f"{k}: {v}" for k, v in self.group_by("type", m)))
+        if "year" not in filters:
+            by_semester = self.group_by("semester", m)
+            lines.append("Count by semester: " + ", ".join(f"{k}: {v}" for k, v in by_semester))
+        else:
+            lines.append("ECTS by department: " + ", ".join(f"{k}: {v:g}" for k, v in self.group_by("dept", m, "ects")))
+        if "dept" not in filters or len(filters["dept"]) > 1:
+            lines.append("Count by department: " + ", ".join(f"{k}: {v}" for k, v in self.group_by("dept", m)))
+
+        rows = np.flatnonzero(m)
+        lines.append("Rows:")
+        for i in rows[:MAX_LISTED_ROWS]:
+            ects = "?" if np.isnan(self.ects[i]) else f"{self.ects[i]:g}"
+            lines.append(f"- {self.code[i]} | {self.name[i]} | {self.dept[i]} | {self.semester[i]} | {self.type[i]} | {ects} ECTS | {self.weeks[i]} weeks")
+        if len(rows) > MAX_LISTED_ROWS:
+            lines.append(f"... {len(rows) - MAX_LISTED_ROWS} more rows not listed")
+        return "\n".join(lines)
@@ -0,0 +1,128 @@
+import json
+import os
+import threading
+from collections import deque
+
+
+class CrawlCheckpoint:
+    def __init__(self, records_path="ieu_courses_final.jsonl", frontier_path="crawl_frontier.json", resume=False):
+        self.records_path = records_path
+        self.frontier_path = frontier_path
+        self.lock = threading.RLock()
+        self.queue = deque()
+        self.keys = set()
+        self.visited = set()
+        self.completed_departments = []
+        self.pending = {}
+        self.written = 0
+        self.resumed = 0
+
+        if resume and os.path.exists(records_path):
+            good_bytes = 0
+            with open(records_path, "rb") as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        break
+                    if not line.endswith(b"\n"):
+                        break
+                    good_bytes += len(line)
+                    self.keys.add((record["department"], record["course_code"]))
+                    self.resumed += 1
+            with open(records_path, "r+b") as f:
+                f.truncate(good_bytes)
+            if os.path.exists(frontier_path):
+                with open(frontier_path, "r", encoding="utf-8") as f:
+                    frontier = json.load(f)
+                self.visited = {tuple(page) for page in frontier.get("visited", [])}
+                self.completed_departments = frontier.get("completed_departments", [])
+        else:
+            open(records_path, "w", encoding="utf-8").close()
+            if os.path.exists(frontier_path):
+                os.remove(frontier_path)
+
+        self.output = open(records_path, "a", encoding="utf-8")
+
+    def seen(self, department, course_code):
+        return (department, course_code) in self.keys
+
+    def department_done(self, department):
+        return department in self.completed_departments
+
+    def page_done(self, department, url):
+        return (department, url) in self.visited
+
+    def add(self, record, details=None, adjust=None):
+        key = (record["department"], record["course_code"])
+        with self.lock:
+            if key in self.keys:
+                return False
+            self.keys.add(key)
+            self.queue.append(("record", record, details, adjust))
+            if details is not None:
+                self.pending[id(record)] = record["url"]
+        if details is not None:
+            details.add_done_callback(lambda f: self.flush())
+        else:
+            self.flush()
+        return True
+
+    def mark_page(self, department, url):
+        with self.lock:
+            self.queue.append(("page", (department, url), None, None))
+        self.flush()
+
+    def mark_department(self, department):
+        with self.lock:
+            self.queue.append(("department", department, None, None))
+        self.flush()
+
+    def flush(self):
+        with self.lock:
+            progressed = False
+            while self.queue:
+                kind, item, details, adjust = self.queue[0]
+                if details is not None and not details.done():
+                    break
+                self.queue.popleft()
+                progressed = True
+
+                if kind == "record":
+                    if details is not None:
+                        fetched = details.result()
+                        fetched = dict(fetched, weekly_topics=list(fetched["weekly_topics"]))
+                        if adjust: adjust(fetched)
+                        for key in ("objectives", "description", "prerequisites", "weekly_topics"):
+                            item[key] = fetched[key]
+                        self.pending.pop(id(item), None)
+                    self.output.write(json.dumps(item, ensure_ascii=False) + "\n")
+                    self.written += 1
+                elif kind == "page":
+                    self.visited.add(item)
+                elif kind == "department":
+                    self.completed_departments.append(item)
+
+            if progressed:
+                self.output.flush()
+                self.save_frontier()
+
+    def save_frontier(self):
+        frontier = {
+            "completed_departments": self.completed_departments,
+            "visited": sorted(self.visited),
+            "pending": sorted(set(self.pending.values())),
+            "records": self.resumed + self.written
+        }
+        tmp_path = self.frontier_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(frontier, f, ensure_ascii=False, indent=4)
+        os.replace(tmp_path, self.frontier_path)
+
+    def close(self):
+        self.flush()
+        self.output.close()
+
+    def records(self):
+        with open(self.records_path, "r", encoding="utf-8") as f:
+            return [json.loads(line) for line in f if line.strip()]
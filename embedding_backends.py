@@ -0,0 +1,52 @@
+import os
+
+from langchain_openai import OpenAIEmbeddings
+
+from embedding_cache import CachedEmbeddings
+from embedding_scheduler import ScheduledEmbeddings
+from local_embeddings import HashingEmbeddings
+
+BACKEND_ENV = "RAG_EMBEDDING_BACKEND"
+DEFAULT_BACKEND = "openai"
+OPENAI_MODEL = "text-embedding-3-small"
+HASHING_DIMENSIONS = 1024
+LEGACY_BACKEND = f"openai:{OPENAI_MODEL}"
+
+BACKEND_NAMES = {
+    "openai": f"openai:{OPENAI_MODEL}",
+    "hashing": f"hashing:{HASHING_DIMENSIONS}"
+}
+
+
+def configured_backend():
+    backend = os.environ.get(BACKEND_ENV, DEFAULT_BACKEND).strip().lower()
+    if backend not in BACKEND_NAMES:
+        raise ValueError(f"Unknown embedding backend '{backend}' in {BACKEND_ENV} (expected one of: {', '.join(BACKEND_NAMES)})")
+    return backend
+
+
+def backend_name(backend=None):
+    return BACKEND_NAMES[backend or configured_backend()]
+
+
+def make_embeddings(backend=None, scheduler_options=None):
+    backend = backend or configured_backend()
+    if backend == "hashing":
+        return HashingEmbeddings(HASHING_DIMENSIONS)
+    if scheduler_options is not None:
+        inner = ScheduledEmbeddings(OpenAIEmbeddings(model=OPENAI_MODEL, max_retries=0), **scheduler_options)
+    else:
+        inner = OpenAIEmbeddings(model=OPENAI_MODEL)
+    return CachedEmbeddings(inner, OPENAI_MODEL)
+
+
+def index_backend(manifest):
+    return manifest.get("embedding_backend", LEGACY_BACKEND)
+
+
+def check_index_backend(manifest, backend=None):
+    built_with = index_backend(manifest)
+    expected = backend_name(backend)
+    if built_with != expected:
+        raise RuntimeError(f"The index was built with the '{built_with}' embedding backend but '{expected}' is configured. "
+                           f"Rebuild it with vectorize_data.py or set {BACKEND_ENV} to match.")
@@ -0,0 +1,154 @@
+import atexit
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+CACHE_DIR = "./embedding_cache"
+BLOCK_ROWS = 1024
+
+
+def text_key(text):
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def tail_hash(vectors):
+    return hashlib.sha256(np.ascontiguousarray(vectors[-1:]).tobytes()).hexdigest()
+
+
+class CachedEmbeddings(Embeddings):
+    def __init__(self, inner, model_name, cache_dir=CACHE_DIR, save_every=256, save_interval=30.0):
+        self.inner = inner
+        self.model_name = model_name
+        self.save_every = save_every
+        self.save_interval = save_interval
+        self.lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0, "shared": 0}
+
+        os.makedirs(cache_dir, exist_ok=True)
+        safe_name = re.sub(r"[^A-Za-z0-9_.-]", "_", model_name)
+        self.vectors_path = os.path.join(cache_dir, safe_name + ".npy")
+        self.index_path = os.path.join(cache_dir, safe_name + ".index.json")
+
+        self.rows = {}
+        self.vectors = None
+        self.count = 0
+        self.unsaved = 0
+        self.saved_at = time.monotonic()
+        self.in_flight = {}
+        if os.path.exists(self.vectors_path) and os.path.exists(self.index_path):
+            self.load()
+        atexit.register(self.flush)
+
+    def load(self):
+        try:
+            with open(self.index_path, "r", encoding="utf-8") as f:
+                index = json.load(f)
+            vectors = np.load(self.vectors_path)
+            count, dimensions = index["shape"]
+            rows = index["rows"]
+        except (OSError, ValueError, KeyError, TypeError):
+            return
+        if (index.get("model") != self.model_name or vectors.dtype != np.float32 or vectors.ndim != 2
+                or vectors.shape[1] != dimensions or vectors.shape[0] < count or len(rows) != count
+                or tail_hash(vectors[:count]) != index.get("tail_sha256")):
+            return
+        self.rows, self.vectors, self.count = rows, vectors[:count], count
+
+    def save(self):
+        vectors = self.vectors[:self.count]
+        tmp_vectors = self.vectors_path + ".tmp.npy"
+        np.save(tmp_vectors, vectors)
+        os.replace(tmp_vectors, self.vectors_path)
+        tmp_index = self.index_path + ".tmp"
+        with open(tmp_index, "w", encoding="utf-8") as f:
+            json.dump({"model": self.model_name, "shape": list(vectors.shape), "tail_sha256": tail_hash(vectors),
+                       "rows": self.rows}, f)
+        os.replace(tmp_index, self.index_path)
+        self.unsaved = 0
+        self.saved_at = time.monotonic()
+
+    def flush(self):
+        with self.lock:
+            if self.unsaved:
+                self.save()
+
+    def append(self, keys, new_vectors):
+        needed = self.count + len(keys)
+        if self.vectors is None or needed > len(self.vectors):
+            capacity = max(needed, BLOCK_ROWS, 2 * (0 if self.vectors is None else len(self.vectors)))
+            grown = np.empty((capacity, new_vectors.shape[1]), dtype=np.float32)
+            if self.count:
+                grown[:self.count] = self.vectors[:self.count]
+            self.vectors = grown
+        self.vectors[self.count:needed] = new_vectors
+        for offset, key in enumerate(keys):
+            self.rows[key] = self.count + offset
+        self.count = needed
+        self.unsaved += len(keys)
+        if self.unsaved >= self.save_every or time.monotonic() - self.saved_at >= self.save_interval:
+            self.save()
+
+    def lookup(self, texts, embed):
+        keys = [text_key(text) for text in texts]
+        with self.lock:
+            missing = {}
+            waiting = {}
+            for key, text in zip(keys, texts):
+                if key in self.rows or key in missing or key in waiting:
+                    continue
+                if key in self.in_flight:
+                    waiting[key] = (text, self.in_flight[key])
+                else:
+                    missing[key] = text
+                    self.in_flight[key] = threading.Event()
+            self.stats["hits"] += len(keys) - len(missing) - len(waiting)
+            self.stats["misses"] += len(missing)
+            self.stats["shared"] += len(waiting)
+
+        if missing:
+            try:
+                new_vectors = np.asarray(embed(list(missing.values())), dtype=np.float32)
+                with self.lock:
+                    self.append(list(missing), new_vectors)
+            finally:
+                with self.lock:
+                    for key in missing:
+                        self.in_flight.pop(key).set()
+
+        for text, event in waiting.values():
+            event.wait()
+        failed = [text for key, (text, _) in waiting.items() if key not in self.rows]
+        if failed:
+            self.lookup(failed, embed)
+
+        with self.lock:
+            return [self.vectors[self.rows[key]].tolist() for key in keys]
+
+    def embed_documents(self, texts):
+        return self.lookup(texts, self.inner.embed_documents)
+
+    def embed_query(self, text):
+        return self.lookup([text], lambda missing: [self.inner.embed_query(missing[0])])[0]
+
+    def cache_stats(self):
+        total = self.stats["hits"] + self.stats["misses"]
+        return {
+            "model": self.model_name,
+            "entries": len(self.rows),
+            "hits": self.stats["hits"],
+            "misses": self.stats["misses"],
+            "shared": self.stats["shared"],
+            "hit_rate": self.stats["hits"] / total if total else 0.0
+        }
+
+    def report(self):
+        if hasattr(self.inner, "report"):
+            self.inner.report()
+        s = self.cache_stats()
+        print(f"Embedding cache ({s['model']}): {s['entries']} entries, {s['hits']} hits, {s['misses']} misses ({s['shared']} shared with a concurrent call), hit rate {s['hit_rate']:.0%}")
@@ -0,0 +1,138 @@
+import hashlib
+import json
+import os
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+CHECKPOINT_DIR = "./embedding_cache/batches"
+
+
+def token_counter():
+    try:
+        import tiktoken
+        encoding = tiktoken.get_encoding("cl100k_base")
+        return lambda text: len(encoding.encode(text, disallowed_special=()))
+    except Exception:
+        return lambda text: max(1, len(text) // 4)
+
+
+class TokenRateLimiter:
+    def __init__(self, tokens_per_minute):
+        self.capacity = tokens_per_minute
+        self.rate = tokens_per_minute / 60.0
+        self.available = float(tokens_per_minute)
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self, tokens):
+        tokens = min(tokens, self.capacity)
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.available = min(self.capacity, self.available + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.available >= tokens:
+                    self.available -= tokens
+                    return
+                wait = (tokens - self.available) / self.rate
+            time.sleep(wait)
+
+
+class ScheduledEmbeddings(Embeddings):
+    def __init__(self, inner, max_batch_tokens=8000, max_batch_size=256, max_concurrency=4,
+                 tokens_per_minute=1000000, max_retries=5, backoff=1.0, checkpoint_dir=CHECKPOINT_DIR):
+        self.inner = inner
+        self.max_batch_tokens = max_batch_tokens
+        self.max_batch_size = max_batch_size
+        self.max_concurrency = max_concurrency
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.checkpoint_dir = checkpoint_dir
+        self.limiter = TokenRateLimiter(tokens_per_minute)
+        self.count_tokens = token_counter()
+        self.stats_lock = threading.Lock()
+        self.stats = {"batches": 0, "resumed": 0, "retries": 0, "tokens": 0}
+
+    def count(self, key, amount=1):
+        with self.stats_lock:
+            self.stats[key] += amount
+
+    def pack(self, texts):
+        batches = []
+        current, current_tokens = [], 0
+        for i, text in enumerate(texts):
+            tokens = self.count_tokens(text)
+            if current and (current_tokens + tokens > self.max_batch_tokens or len(current) >= self.max_batch_size):
+                batches.append((current, current_tokens))
+                current, current_tokens = [], 0
+            current.append(i)
+            current_tokens += tokens
+        if current:
+            batches.append((current, current_tokens))
+        return batches
+
+    def checkpoint_path(self, batch_texts):
+        key = hashlib.sha256(json.dumps(batch_texts).encode("utf-8")).hexdigest()
+        return os.path.join(self.checkpoint_dir, key + ".npy")
+
+    def run_batch(self, batch_texts, tokens):
+        path = self.checkpoint_path(batch_texts)
+        if os.path.exists(path):
+            self.count("resumed")
+            return path, np.load(path)
+
+        attempt = 0
+        while True:
+            self.limiter.acquire(tokens)
+            try:
+                vectors = np.asarray(self.inner.embed_documents(batch_texts), dtype=np.float32)
+                break
+            except Exception as e:
+                if attempt >= self.max_retries:
+                    raise
+                self.count("retries")
+                delay = self.backoff * (2 ** attempt) + random.uniform(0, self.backoff)
+                print(f"  ! Embedding batch of {len(batch_texts)} failed ({e}), retrying in {delay:.1f}s")
+                time.sleep(delay)
+                attempt += 1
+
+        tmp_path = path + ".tmp.npy"
+        np.save(tmp_path, vectors)
+        os.replace(tmp_path, path)
+        self.count("batches")
+        self.count("tokens", tokens)
+        return path, vectors
+
+    def embed_documents(self, texts):
+        texts = list(texts)
+        if not texts:
+            return []
+        os.makedirs(self.checkpoint_dir, exist_ok=True)
+
+        batches = self.pack(texts)
+        results = [None] * len(texts)
+        with ThreadPoolExecutor(max_workers=self.max_concurrency) as pool:
+            futures = [(indexes, pool.submit(self.run_batch, [texts[i] for i in indexes], tokens))
+                       for indexes, tokens in batches]
+            finished = [(indexes, future.result()) for indexes, future in futures]
+
+        for indexes, (path, vectors) in finished:
+            for i, vector in zip(indexes, vectors):
+                results[i] = vector.tolist()
+        for _, (path, _) in finished:
+            if os.path.exists(path):
+                os.remove(path)
+        return results
+
+    def embed_query(self, text):
+        return self.inner.embed_query(text)
+
+    def report(self):
+        s = self.stats
+        print(f"Embedding scheduler: {s['batches']} batches ({s['tokens']} tokens), "
+              f"{s['resumed']} resumed from checkpoint, {s['retries']} retries")
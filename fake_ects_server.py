@@ -0,0 +1,219 @@
+import argparse
+import hashlib
+import html
+import json
+import random
+import re
+import time
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+from web_scraping import departments
+
+SFL_NOTE = " Second Foreign Language course. See available language options."
+LANG_NOTE = " This course is available for selection as a Second Foreign Language (SFL) option."
+
+
+def section_of(url):
+    return parse_qs(urlparse(url).query).get("section", [""])[0]
+
+
+def split_note(description, pattern):
+    match = re.match(pattern, description, re.DOTALL)
+    if match:
+        return match.group(1), match.group(2)
+    return description, ""
+
+
+def detail_fields(course):
+    description = course["description"]
+    hover = ""
+    if course["type"] == "Mandatory - Pool Selection":
+        description, _ = split_note(description, r"^(.*) \[Source: Pool (\w+)\]$")
+    elif course["semester"] == "Language Selection":
+        description = description[:-len(LANG_NOTE)] if description.endswith(LANG_NOTE) else description
+    elif course["type"] == "Mandatory":
+        if description.endswith(SFL_NOTE):
+            description = description[:-len(SFL_NOTE)]
+        description, hover = split_note(description, r"^(.*) \[Note: (.*)\]$")
+    return description, hover
+
+
+def render_detail(course):
+    description, _ = detail_fields(course)
+    rows = []
+    for label, value in (("Course Objectives", course["objectives"]),
+                         ("Course Description", description),
+                         ("Prerequisites", course["prerequisites"])):
+        if value != "Not specified":
+            rows.append(f"<tr><td>{label}</td><td>{html.escape(value)}</td></tr>")
+
+    weeks = ["<tr><th>Week</th><th>Subjects</th></tr>"]
+    for entry in course["weekly_topics"]:
+        label, _, topic = entry.partition(": ")
+        week = label.replace("Week ", "") if label.startswith("Week ") else "Final"
+        weeks.append(f"<tr><td>{html.escape(week)}</td><td>{html.escape(topic)}</td></tr>")
+
+    return (
+        f"<html><body><h2>{html.escape(course['course_code'])}</h2>"
+        f"<table>{''.join(rows)}</table>"
+        f"<table id=\"weeks\">{''.join(weeks)}</table></body></html>"
+    )
+
+
+def code_cell(course, hover):
+    code = html.escape(course["course_code"])
+    hover_attr = f' data-content="{html.escape(hover, quote=True)}"' if hover else ""
+    if course["url"]:
+        return f'<td><a href="{html.escape(course["url"], quote=True)}"{hover_attr}>{code}</a></td>'
+    return f"<td{hover_attr}>{code}</td>"
+
+
+def curriculum_row(course):
+    hover = ""
+    if course["type"] == "Elective - Placeholder":
+        _, hover = split_note(course["description"], r"^(Check the Elective Tables below for options\.) Options: (.*)$")
+    elif course["type"] == "Mandatory":
+        _, hover = detail_fields(course)
+    return (
+        f"<tr>{code_cell(course, hover)}<td></td><td>{html.escape(course['course_name'])}</td>"
+        f"<td>3</td><td>0</td><td>{html.escape(course['local_credit'])}</td><td>{html.escape(course['ects'])}</td></tr>"
+    )
+
+
+def table(title, rows):
+    header = "<tr><td>Code</td><td>Pre.</td><td>Course Name</td><td>T</td><td>A</td><td>Local Credits</td><td>ECTS</td></tr>"
+    return f"<table><tr><th colspan=\"7\">{html.escape(title)}</th></tr>{header}{''.join(rows)}</table>"
+
+
+class Catalog:
+    def __init__(self, courses):
+        self.departments = {}
+        self.details = {}
+        self.pools = {}
+        for dept in departments:
+            self.departments[section_of(dept["url"])] = [c for c in courses if c["department"] == dept["name"]]
+        for section, dept_courses in self.departments.items():
+            for course in dept_courses:
+                if course["url"]:
+                    self.details.setdefault((section_of(course["url"]) or section, course["course_code"]), course)
+                match = re.match(r"From Pool (\w+)", course["semester"])
+                if match:
+                    self.pools.setdefault((section, match.group(1)), []).append(course)
+
+    def department_page(self, section):
+        courses = self.departments.get(section)
+        if courses is None:
+            return None
+
+        semesters = OrderedDict()
+        electives = []
+        links = []
+        for course in courses:
+            if course["semester"] == "Elective Table":
+                electives.append(curriculum_row(course))
+            elif course["semester"] == "Language Selection":
+                links.append(f'<a href="{html.escape(course["url"], quote=True)}">{html.escape(course["course_code"])}</a>')
+            elif "Semester" in course["semester"]:
+                semesters.setdefault(course["semester"], []).append(curriculum_row(course))
+
+        pool_rows = [
+            f'<tr><td><a href="pool.php?section={section}&amp;pool={pool_id}">POOL {pool_id}</a></td>'
+            f'<td></td><td>Pool {pool_id}</td><td></td><td></td><td></td><td></td></tr>'
+            for (pool_section, pool_id) in self.pools if pool_section == section
+        ]
+        if semesters and pool_rows:
+            last = next(reversed(semesters))
+            semesters[last] = semesters[last] + pool_rows
+
+        tables = [table(name, rows) for name, rows in semesters.items()]
+        if electives:
+            tables.append(table("Elective Courses", electives))
+        return f"<html><body><div>{''.join(links)}</div>{''.join(tables)}</body></html>"
+
+    def pool_page(self, section, pool_id):
+        courses = self.pools.get((section, pool_id))
+        if courses is None:
+            return None
+        rows = [f"<tr><td colspan=\"6\">POOL {html.escape(pool_id)}</td></tr>",
+                "<tr><td>Code</td><td>Course Name</td><td>T</td><td>A</td><td>Local Credits</td><td>ECTS</td></tr>"]
+        for course in courses:
+            rows.append(
+                f"<tr>{code_cell(course, '')}<td>{html.escape(course['course_name'])}</td>"
+                f"<td>3</td><td>0</td><td>-</td><td>{html.escape(course['ects'])}</td></tr>"
+            )
+        return f"<html><body><table>{''.join(rows)}</table></body></html>"
+
+    def page(self, path, query):
+        section = query.get("section", [""])[0]
+        if path.endswith("akademik.php"):
+            return self.department_page(section)
+        if path.endswith("pool.php"):
+            return self.pool_page(section, query.get("pool", [""])[0])
+        if path.endswith("syllabus.php"):
+            course = self.details.get((section, query.get("course_code", [""])[0]))
+            return render_detail(course) if course else None
+        return None
+
+
+def make_handler(catalog, latency=0.0, fail_rate=0.0):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_GET(self):
+            if latency:
+                time.sleep(latency)
+            if fail_rate and random.random() < fail_rate:
+                self.send_response(503)
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return
+
+            parsed = urlparse(self.path)
+            body = catalog.page(parsed.path, parse_qs(parsed.query))
+            if body is None:
+                self.send_response(404)
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return
+
+            payload = body.encode("utf-8")
+            etag = '"' + hashlib.md5(payload).hexdigest() + '"'
+            if self.headers.get("If-None-Match") == etag:
+                self.send_response(304)
+                self.send_header("ETag", etag)
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return
+
+            self.send_response(200)
+            self.send_header("Content-Type", "text/html; charset=utf-8")
+            self.send_header("ETag", etag)
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def log_message(self, format, *args):
+            pass
+
+    return Handler
+
+
+def make_server(source="ieu_courses_final.json", host="127.0.0.1", port=8000, latency=0.0, fail_rate=0.0):
+    with open(source, "r", encoding="utf-8") as f:
+        catalog = Catalog(json.load(f))
+    return ThreadingHTTPServer((host, port), make_handler(catalog, latency, fail_rate))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--source", default="ieu_courses_final.json")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds added to every response")
+    parser.add_argument("--fail-rate", type=float, default=0.0, help="fraction of requests answered with 503")
+    args = parser.parse_args()
+
+    server = make_server(args.source, port=args.port, latency=args.latency, fail_rate=args.fail_rate)
+    print(f"Serving ECTS stand-in on http://127.0.0.1:{args.port}/new/")
+    server.serve_forever()
@@ -0,0 +1,204 @@
+import argparse
+import hashlib
+import json
+import random
+import select
+import socket
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+
+
+def fake_vector(item, dimensions):
+    seed = int(hashlib.sha256(json.dumps(item).encode("utf-8")).hexdigest()[:8], 16)
+    vector = np.random.default_rng(seed).standard_normal(dimensions)
+    return (vector / np.linalg.norm(vector)).tolist()
+
+
+def fake_answer(request):
+    messages = request.get("messages") or [{}]
+    digest = hashlib.sha256(json.dumps(messages).encode("utf-8")).hexdigest()[:8]
+    return f"This is a fake answer from {request.get('model', 'fake')} for prompt {digest}."
+
+
+class FakeState:
+    def __init__(self, dimensions=1536, latency=0.0, fail_rate=0.0, ttft=0.0, token_delay=0.0,
+                 stall_rate=0.0, stall_seconds=30.0, stall_model=None):
+        self.dimensions = dimensions
+        self.latency = latency
+        self.fail_rate = fail_rate
+        self.ttft = ttft
+        self.token_delay = token_delay
+        self.stall_rate = stall_rate
+        self.stall_seconds = stall_seconds
+        self.stall_model = stall_model
+        self.lock = threading.Lock()
+        self.stats = {"embedding_requests": 0, "embedded_inputs": 0, "failures": 0,
+                      "chat_requests": 0, "stalled": 0, "completed_streams": 0, "cancelled_streams": 0}
+
+    def first_token_delay(self, model):
+        if self.stall_rate and (self.stall_model is None or model == self.stall_model) and random.random() < self.stall_rate:
+            self.count("stalled")
+            return self.stall_seconds
+        return self.ttft
+
+    def count(self, key, amount=1):
+        with self.lock:
+            self.stats[key] += amount
+
+
+def make_handler(state):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def send_json(self, status, payload):
+            body = json.dumps(payload).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def read_json(self):
+            length = int(self.headers.get("Content-Length", 0))
+            return json.loads(self.rfile.read(length) or b"{}")
+
+        def do_GET(self):
+            if self.path.rstrip("/").endswith("/stats"):
+                self.send_json(200, state.stats)
+            else:
+                self.send_json(404, {"error": {"message": "not found"}})
+
+        def do_POST(self):
+            request = self.read_json()
+            if state.latency:
+                time.sleep(state.latency)
+            if state.fail_rate and random.random() < state.fail_rate:
+                state.count("failures")
+                self.send_json(429, {"error": {"message": "Rate limit reached (injected)", "type": "requests"}})
+                return
+
+            if self.path.rstrip("/").endswith("/embeddings"):
+                self.embeddings(request)
+            elif self.path.rstrip("/").endswith("/chat/completions"):
+                self.chat(request)
+            else:
+                self.send_json(404, {"error": {"message": "not found"}})
+
+        def embeddings(self, request):
+            inputs = request.get("input", [])
+            if isinstance(inputs, str) or (inputs and isinstance(inputs[0], int)):
+                inputs = [inputs]
+            dimensions = request.get("dimensions") or state.dimensions
+            state.count("embedding_requests")
+            state.count("embedded_inputs", len(inputs))
+            tokens = sum(len(item) if isinstance(item, list) else max(1, len(item) // 4) for item in inputs)
+            self.send_json(200, {
+                "object": "list",
+                "model": request.get("model", "fake"),
+                "data": [{"object": "embedding", "index": i, "embedding": fake_vector(item, dimensions)}
+                         for i, item in enumerate(inputs)],
+                "usage": {"prompt_tokens": tokens, "total_tokens": tokens}
+            })
+
+        def client_gone(self):
+            readable, _, _ = select.select([self.connection], [], [], 0)
+            try:
+                return bool(readable) and not self.connection.recv(1, socket.MSG_PEEK)
+            except OSError:
+                return True
+
+        def wait(self, seconds):
+            end = time.monotonic() + seconds
+            while time.monotonic() < end:
+                if self.client_gone():
+                    return False
+                time.sleep(min(0.01, max(0.0, end - time.monotonic())))
+            return True
+
+        def chat(self, request):
+            state.count("chat_requests")
+            model = request.get("model", "fake")
+            tokens = fake_answer(request).split(" ")
+            if not self.wait(state.first_token_delay(model)):
+                state.count("cancelled_streams")
+                return
+            usage = {"prompt_tokens": sum(len(str(m.get("content", ""))) // 4 for m in request.get("messages", [])),
+                     "completion_tokens": len(tokens)}
+            usage["total_tokens"] = usage["prompt_tokens"] + usage["completion_tokens"]
+
+            if not request.get("stream"):
+                time.sleep(state.token_delay * len(tokens))
+                self.send_json(200, {
+                    "id": "chatcmpl-fake", "object": "chat.completion", "created": int(time.time()), "model": model,
+                    "choices": [{"index": 0, "message": {"role": "assistant", "content": " ".join(tokens)}, "finish_reason": "stop"}],
+                    "usage": usage
+                })
+                return
+
+            self.send_response(200)
+            self.send_header("Content-Type", "text/event-stream")
+            self.send_header("Connection", "close")
+            self.end_headers()
+            self.close_connection = True
+
+            def event(delta, finish_reason=None, **extra):
+                choices = [{"index": 0, "delta": delta, "finish_reason": finish_reason}] if delta is not None else []
+                payload = {"id": "chatcmpl-fake", "object": "chat.completion.chunk", "created": int(time.time()),
+                           "model": model, "choices": choices, **extra}
+                self.wfile.write(f"data: {json.dumps(payload)}\n\n".encode("utf-8"))
+                self.wfile.flush()
+
+            try:
+                for i, token in enumerate(tokens):
+                    if i and not self.wait(state.token_delay):
+                        raise ConnectionResetError
+                    event({"role": "assistant", "content": token} if i == 0 else {"content": " " + token})
+                event({}, "stop")
+                if (request.get("stream_options") or {}).get("include_usage"):
+                    event(None, usage=usage)
+                self.wfile.write(b"data: [DONE]\n\n")
+                self.wfile.flush()
+            except (BrokenPipeError, ConnectionResetError):
+                state.count("cancelled_streams")
+                return
+            state.count("completed_streams")
+
+        def log_message(self, format, *args):
+            pass
+
+    return Handler
+
+
+class FakeServer(ThreadingHTTPServer):
+    request_queue_size = 128
+    daemon_threads = True
+
+
+def make_server(host="127.0.0.1", port=8001, **options):
+    state = FakeState(**options)
+    server = FakeServer((host, port), make_handler(state))
+    server.state = state
+    return server
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--port", type=int, default=8001)
+    parser.add_argument("--dimensions", type=int, default=1536)
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds added to every response")
+    parser.add_argument("--fail-rate", type=float, default=0.0, help="fraction of requests answered with 429")
+    parser.add_argument("--ttft", type=float, default=0.0, help="seconds before the first chat completion token")
+    parser.add_argument("--token-delay", type=float, default=0.0, help="seconds between streamed chat completion tokens")
+    parser.add_argument("--stall-rate", type=float, default=0.0, help="fraction of chat completions whose first token is delayed by --stall-seconds")
+    parser.add_argument("--stall-seconds", type=float, default=30.0)
+    parser.add_argument("--stall-model", help="only stall completions for this model")
+    args = parser.parse_args()
+
+    server = make_server(port=args.port, dimensions=args.dimensions, latency=args.latency, fail_rate=args.fail_rate,
+                         ttft=args.ttft, token_delay=args.token_delay, stall_rate=args.stall_rate,
+                         stall_seconds=args.stall_seconds, stall_model=args.stall_model)
+    print(f"Serving fake OpenAI API on http://127.0.0.1:{args.port}/v1 (set OPENAI_BASE_URL to use it)")
+    server.serve_forever()
@@ -0,0 +1,101 @@
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+class HostRateLimiter:
+    def __init__(self, requests_per_second):
+        self.interval = 1.0 / requests_per_second if requests_per_second > 0 else 0.0
+        self.lock = threading.Lock()
+        self.next_slot = {}
+
+    def wait(self, host):
+        if not self.interval:
+            return
+        with self.lock:
+            now = time.monotonic()
+            slot = max(now, self.next_slot.get(host, now))
+            self.next_slot[host] = slot + self.interval
+        if slot > now:
+            time.sleep(slot - now)
+
+
+class Fetcher:
+    def __init__(self, max_workers=8, requests_per_second=5.0, max_retries=3, backoff=0.5, timeout=30, cache=None):
+        self.cache = cache
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.timeout = timeout
+        self.limiter = HostRateLimiter(requests_per_second)
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=max_workers + 1)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+        self.executor = ThreadPoolExecutor(max_workers=max_workers)
+        self.stats_lock = threading.Lock()
+        self.stats = {"requests": 0, "retries": 0, "failures": 0}
+
+    def count(self, key):
+        with self.stats_lock:
+            self.stats[key] += 1
+
+    def retry_delay(self, attempt, response=None):
+        if response is not None:
+            retry_after = response.headers.get("Retry-After", "")
+            if retry_after.isdigit():
+                return float(retry_after)
+        return self.backoff * (2 ** attempt) + random.uniform(0, self.backoff)
+
+    def get(self, url, headers=None):
+        host = urlparse(url).netloc
+        attempt = 0
+        while True:
+            self.limiter.wait(host)
+            self.count("requests")
+            try:
+                response = self.session.get(url, headers=headers, timeout=self.timeout)
+            except (requests.ConnectionError, requests.Timeout):
+                if attempt >= self.max_retries:
+                    self.count("failures")
+                    raise
+                self.count("retries")
+                time.sleep(self.retry_delay(attempt))
+                attempt += 1
+                continue
+
+            if response.status_code in RETRY_STATUSES and attempt < self.max_retries:
+                self.count("retries")
+                time.sleep(self.retry_delay(attempt, response))
+                attempt += 1
+                continue
+
+            if response.status_code >= 400:
+                self.count("failures")
+                response.raise_for_status()
+            return response
+
+    def fetch(self, url):
+        if self.cache:
+            return self.cache.fetch(self, url)
+        return self.get(url).content
+
+    def submit(self, fn, *args, **kwargs):
+        return self.executor.submit(fn, *args, **kwargs)
+
+    def close(self):
+        self.executor.shutdown(wait=True)
+        self.session.close()
+
+    def report(self):
+        print(f"Fetcher: {self.stats['requests']} requests, {self.stats['retries']} retries, {self.stats['failures']} failures")
+        if self.cache:
+            self.cache.report()
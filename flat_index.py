@@ -0,0 +1,236 @@
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+
+import numpy as np
+from langchain_core.documents import Document
+
+FLAT_META_FILE = "flat_index.json"
+FLAT_FILES = {"float16": "flat_vectors.f16.npy", "int8": "flat_vectors.i8.npy"}
+FLAT_SCALES_FILE = "flat_scales.npy"
+MASK_FIELDS = ["code"]
+SCORE_BLOCK_ROWS = 4096
+
+
+def normalize_rows(matrix):
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    return matrix / np.where(norms == 0, 1.0, norms)
+
+
+def quantize_int8(matrix):
+    scales = np.abs(matrix).max(axis=1) / 127.0
+    scales[scales == 0] = 1.0
+    return np.round(matrix / scales[:, None]).astype(np.int8), scales.astype(np.float32)
+
+
+def export_flat_index(store, db_dir, version):
+    data = store.get(include=["embeddings", "documents", "metadatas"])
+    order = np.argsort(data["ids"], kind="stable")
+    ids = [data["ids"][i] for i in order]
+    vectors = normalize_rows(np.asarray(data["embeddings"], dtype=np.float32)[order]) if ids else np.zeros((0, 0), dtype=np.float32)
+
+    np.save(os.path.join(db_dir, FLAT_FILES["float16"]), vectors.astype(np.float16))
+    quantized, scales = quantize_int8(vectors) if ids else (vectors.astype(np.int8), np.zeros(0, dtype=np.float32))
+    np.save(os.path.join(db_dir, FLAT_FILES["int8"]), quantized)
+    np.save(os.path.join(db_dir, FLAT_SCALES_FILE), scales)
+
+    meta = {
+        "version": version,
+        "dimensions": int(vectors.shape[1]) if ids else 0,
+        "ids": ids,
+        "texts": [data["documents"][i] for i in order],
+        "metadatas": [data["metadatas"][i] for i in order]
+    }
+    with open(os.path.join(db_dir, FLAT_META_FILE), "w", encoding="utf-8") as f:
+        json.dump(meta, f, ensure_ascii=False)
+    return len(ids)
+
+
+def flat_index_exists(db_dir):
+    return all(os.path.exists(os.path.join(db_dir, name)) for name in [FLAT_META_FILE, FLAT_SCALES_FILE] + list(FLAT_FILES.values()))
+
+
+class FlatIndex:
+    def __init__(self, db_dir, embeddings, dtype="float16", version=None):
+        if dtype not in FLAT_FILES:
+            raise ValueError(f"Unknown flat index dtype '{dtype}' (expected one of: {', '.join(FLAT_FILES)})")
+        with open(os.path.join(db_dir, FLAT_META_FILE), "r", encoding="utf-8") as f:
+            meta = json.load(f)
+        if version is not None and meta["version"] != version:
+            raise RuntimeError("The flat index is older than the Chroma index; rebuild it with vectorize_data.py")
+
+        self.embeddings = embeddings
+        self.dtype = dtype
+        self.ids = meta["ids"]
+        self.texts = meta["texts"]
+        self.metadatas = meta["metadatas"]
+        self.matrix = np.load(os.path.join(db_dir, FLAT_FILES[dtype]), mmap_mode="r")
+        self.scales = np.load(os.path.join(db_dir, FLAT_SCALES_FILE)) if dtype == "int8" else None
+        self.columns = {field: np.array([(m or {}).get(field, "") for m in self.metadatas], dtype=str) for field in MASK_FIELDS}
+
+    def mask(self, filter):
+        m = np.ones(len(self.ids), dtype=bool)
+        for field, condition in (filter or {}).items():
+            values = condition["$in"] if isinstance(condition, dict) else [condition]
+            column = self.columns.get(field)
+            if column is None:
+                column = self.columns[field] = np.array([(meta or {}).get(field) for meta in self.metadatas], dtype=object)
+            if column.dtype == object:
+                m &= np.array([value in values for value in column], dtype=bool)
+            else:
+                m &= np.isin(column, values)
+        return m
+
+    def block_scores(self, queries, start, stop):
+        block = np.asarray(self.matrix[start:stop], dtype=np.float32)
+        if self.scales is not None:
+            block *= self.scales[start:stop, None]
+        return queries @ block.T
+
+    def top_k_batch(self, embeddings, k, filter=None):
+        queries = normalize_rows(np.atleast_2d(np.asarray(embeddings, dtype=np.float32)))
+        mask = self.mask(filter) if filter else None
+        k = min(k, len(self.ids))
+        if k <= 0:
+            return [[] for _ in queries]
+
+        best_scores = np.zeros((len(queries), 0), dtype=np.float32)
+        best_ids = np.zeros((len(queries), 0), dtype=np.int64)
+        for start in range(0, len(self.ids), SCORE_BLOCK_ROWS):
+            stop = min(start + SCORE_BLOCK_ROWS, len(self.ids))
+            scores = self.block_scores(queries, start, stop)
+            if mask is not None:
+                scores = np.where(mask[start:stop], scores, -np.inf)
+            scores = np.concatenate([best_scores, scores], axis=1)
+            ids = np.concatenate([best_ids, np.broadcast_to(np.arange(start, stop), (len(queries), stop - start))], axis=1)
+            if scores.shape[1] > k:
+                keep = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+                scores = np.take_along_axis(scores, keep, axis=1)
+                ids = np.take_along_axis(ids, keep, axis=1)
+            best_scores, best_ids = scores, ids
+
+        results = []
+        for row_scores, row_ids in zip(best_scores, best_ids):
+            ordered = np.lexsort((row_ids, -row_scores))
+            results.append([(int(row_ids[j]), float(row_scores[j])) for j in ordered if np.isfinite(row_scores[j])])
+        return results
+
+    def top_k(self, embedding, k, filter=None):
+        return self.top_k_batch([embedding], k, filter)[0]
+
+    def document(self, i):
+        return Document(id=self.ids[i], page_content=self.texts[i], metadata=self.metadatas[i])
+
+    def similarity_search_by_vector(self, embedding, k=4, filter=None, **kwargs):
+        return [self.document(i) for i, _ in self.top_k(embedding, k, filter)]
+
+    def similarity_search_by_vectors(self, embeddings, k=4, filter=None):
+        return [[self.document(i) for i, _ in hits] for hits in self.top_k_batch(embeddings, k, filter)]
+
+    def similarity_search(self, query, k=4, filter=None, **kwargs):
+        return self.similarity_search_by_vector(self.embeddings.embed_query(query), k, filter)
+
+    def similarity_search_with_score(self, query, k=4, filter=None, **kwargs):
+        return self.similarity_search_by_vector_with_relevance_scores(self.embeddings.embed_query(query), k, filter)
+
+    # Mirrors Chroma, whose method of this name returns distances rather than relevance scores
+    def similarity_search_by_vector_with_relevance_scores(self, embedding, k=4, filter=None, **kwargs):
+        return [(self.document(i), 2.0 - 2.0 * score) for i, score in self.top_k(embedding, k, filter)]
+
+    def similarity_search_with_relevance_scores(self, query, k=4, filter=None, **kwargs):
+        return [(doc, 1.0 - distance / 2 ** 0.5) for doc, distance in self.similarity_search_with_score(query, k, filter)]
+
+
+def rss_mb():
+    try:
+        with open("/proc/self/status", "r") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return None
+
+
+def measure(store_name, dtype, rounds):
+    from rag_pipeline import load_vector_store
+    from test_runner import categories
+
+    questions = [q for q_list in categories.values() for q in q_list]
+    before = rss_mb()
+    start = time.perf_counter()
+    store = load_vector_store(store=store_name, flat_dtype=dtype)
+    store.similarity_search_by_vector(store.embeddings.embed_query("warm up"), k=1)
+    startup = time.perf_counter() - start
+    after = rss_mb()
+
+    vectors = store.embeddings.embed_documents(questions)
+    latencies = []
+    results = []
+    for _ in range(rounds):
+        results = []
+        for vector in vectors:
+            t = time.perf_counter()
+            docs = store.similarity_search_by_vector(vector, k=20)
+            latencies.append((time.perf_counter() - t) * 1000)
+            results.append([d.id for d in docs])
+    return {
+        "startup_s": startup,
+        "rss_mb": None if before is None else after - before,
+        "latency_p50_ms": float(np.percentile(latencies, 50)),
+        "latency_p95_ms": float(np.percentile(latencies, 95)),
+        "vectors": [list(map(float, v)) for v in vectors],
+        "results": results
+    }
+
+
+def benchmark(rounds):
+    from rag_pipeline import DB_DIR, load_vector_store
+
+    runs = {}
+    for store_name, dtype in [("chroma", None), ("flat", "float16"), ("flat", "int8")]:
+        label = store_name if dtype is None else f"{store_name}-{dtype}"
+        command = [sys.executable, os.path.abspath(__file__), "--measure", store_name, "--rounds", str(rounds)]
+        if dtype:
+            command += ["--dtype", dtype]
+        output = subprocess.run(command, check=True, capture_output=True, text=True).stdout
+        runs[label] = json.loads(output.strip().splitlines()[-1])
+
+    store = load_vector_store(store="chroma")
+    data = store.get(include=["embeddings"])
+    exact_ids = np.array(data["ids"])
+    exact = normalize_rows(np.asarray(data["embeddings"], dtype=np.float32))
+    queries = normalize_rows(np.asarray(runs["chroma"]["vectors"], dtype=np.float32))
+    truth = [set(exact_ids[np.argsort(-(exact @ q), kind="stable")[:20]]) for q in queries]
+
+    print(f"Vector store benchmark over {len(queries)} questions, k=20 ({DB_DIR})")
+    print(f"{'backend':<14} {'startup s':>10} {'RSS MB':>8} {'p50 ms':>8} {'p95 ms':>8} {'recall@20':>10}")
+    for label, run in runs.items():
+        recall = np.mean([len(t & set(r)) / len(t) for t, r in zip(truth, run["results"]) if t])
+        rss = "-" if run["rss_mb"] is None else f"{run['rss_mb']:.1f}"
+        print(f"{label:<14} {run['startup_s']:>10.3f} {rss:>8} {run['latency_p50_ms']:>8.3f} {run['latency_p95_ms']:>8.3f} {recall:>10.3f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--export", action="store_true", help="write the flat index files from the current Chroma index")
+    parser.add_argument("--benchmark", action="store_true", help="compare Chroma and the flat index (startup, memory, latency, recall)")
+    parser.add_argument("--measure", choices=["chroma", "flat"], help=argparse.SUPPRESS)
+    parser.add_argument("--dtype", default="float16", choices=list(FLAT_FILES))
+    parser.add_argument("--rounds", type=int, default=5)
+    args = parser.parse_args()
+
+    if args.measure:
+        print(json.dumps(measure(args.measure, args.dtype, args.rounds)))
+    elif args.export:
+        from rag_pipeline import DB_DIR, load_vector_store
+        from vectorize_data import read_manifest
+        count = export_flat_index(load_vector_store(store="chroma"), DB_DIR, read_manifest(DB_DIR).get("version"))
+        print(f"Exported {count} vectors to the flat index in {DB_DIR}.")
+    elif args.benchmark:
+        benchmark(args.rounds)
+    else:
+        parser.print_help()
@@ -0,0 +1,95 @@
+import hashlib
+import json
+import os
+import threading
+import time
+
+
+class HttpCache:
+    def __init__(self, cache_dir="./http_cache", max_age_hours=0):
+        self.cache_dir = cache_dir
+        self.max_age = max_age_hours * 3600
+        self.lock = threading.Lock()
+        self.stats = {"fresh": 0, "revalidated": 0, "unchanged": 0, "updated": 0, "miss": 0}
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def count(self, key):
+        with self.lock:
+            self.stats[key] += 1
+
+    def paths(self, url):
+        key = hashlib.sha256(url.encode("utf-8")).hexdigest()
+        return os.path.join(self.cache_dir, key + ".json"), os.path.join(self.cache_dir, key + ".html")
+
+    def load(self, url):
+        meta_path, body_path = self.paths(url)
+        if not (os.path.exists(meta_path) and os.path.exists(body_path)):
+            return None, None
+        try:
+            with open(meta_path, "r", encoding="utf-8") as f:
+                meta = json.load(f)
+            with open(body_path, "rb") as f:
+                body = f.read()
+        except (OSError, ValueError):
+            return None, None
+        return meta, body
+
+    def write(self, path, data):
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+
+    def store(self, url, meta, body=None):
+        meta_path, body_path = self.paths(url)
+        if body is not None:
+            self.write(body_path, body)
+        self.write(meta_path, json.dumps(meta).encode("utf-8"))
+
+    def fetch(self, fetcher, url):
+        meta, body = self.load(url)
+
+        if meta and self.max_age and time.time() - meta["fetched_at"] < self.max_age:
+            self.count("fresh")
+            return body
+
+        headers = {}
+        if meta:
+            if meta.get("etag"):
+                headers["If-None-Match"] = meta["etag"]
+            if meta.get("last_modified"):
+                headers["If-Modified-Since"] = meta["last_modified"]
+
+        response = fetcher.get(url, headers=headers)
+
+        if meta and response.status_code == 304:
+            meta["fetched_at"] = time.time()
+            self.store(url, meta)
+            self.count("revalidated")
+            return body
+
+        content = response.content
+        content_hash = hashlib.sha256(content).hexdigest()
+        new_meta = {
+            "url": url,
+            "etag": response.headers.get("ETag"),
+            "last_modified": response.headers.get("Last-Modified"),
+            "content_hash": content_hash,
+            "fetched_at": time.time()
+        }
+
+        if meta is None:
+            self.count("miss")
+            self.store(url, new_meta, content)
+        elif meta.get("content_hash") == content_hash:
+            self.count("unchanged")
+            self.store(url, new_meta)
+        else:
+            self.count("updated")
+            self.store(url, new_meta, content)
+        return content
+
+    def report(self):
+        s = self.stats
+        print(f"HTTP cache: {s['fresh']} fresh hits, {s['revalidated']} revalidated (304), "
+              f"{s['unchanged']} unchanged, {s['updated']} updated, {s['miss']} misses")
@@ -0,0 +1,308 @@
+import asyncio
+import contextvars
+import hashlib
+import os
+import queue
+import threading
+import time
+from collections import OrderedDict, deque
+from typing import Any
+
+import numpy as np
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+from langchain_openai import ChatOpenAI
+
+from rag_metrics import record
+
+PRIMARY_MODEL = os.environ.get("RAG_LLM_MODEL", "gpt-4o-mini")
+FALLBACK_MODEL = os.environ.get("RAG_FALLBACK_MODEL", "gpt-4.1-nano")
+
+_loop = None
+_loop_lock = threading.Lock()
+
+
+class LLMDeadlineExceeded(TimeoutError):
+    pass
+
+
+def background_loop():
+    global _loop
+    with _loop_lock:
+        if _loop is None:
+            _loop = asyncio.new_event_loop()
+            threading.Thread(target=_loop.run_forever, name="llm-client", daemon=True).start()
+        return _loop
+
+
+def prompt_key(messages):
+    digest = hashlib.sha256()
+    for m in messages:
+        digest.update(f"{m.type}:{m.content}\n".encode("utf-8"))
+    return digest.hexdigest()
+
+
+async def next_text(stream):
+    try:
+        chunk = await stream.__anext__()
+    except StopAsyncIteration:
+        return None
+    return chunk.content if isinstance(chunk.content, str) else str(chunk.content)
+
+
+class Attempt:
+    def __init__(self, model, messages, source):
+        self.source = source
+        self.start = time.perf_counter()
+        self.stream = model.astream(messages)
+        self.task = asyncio.ensure_future(next_text(self.stream))
+
+    async def close(self):
+        if not self.task.done():
+            self.task.cancel()
+        await asyncio.gather(self.task, return_exceptions=True)
+        await self.stream.aclose()
+
+
+class LLMClient:
+    def __init__(self, primary, fallback=None, deadline=30.0, ttft_timeout=10.0, hedge_percentile=95,
+                 initial_hedge_delay=2.0, min_hedge_delay=0.05, min_samples=20, max_hedges=1,
+                 hedge_budget=0.1, fallback_deadline=10.0, cache_size=256):
+        self.primary = primary
+        self.fallback = fallback
+        self.deadline = deadline
+        self.ttft_timeout = ttft_timeout
+        self.hedge_percentile = hedge_percentile
+        self.initial_hedge_delay = initial_hedge_delay
+        self.min_hedge_delay = min_hedge_delay
+        self.min_samples = min_samples
+        self.max_hedges = max_hedges
+        self.hedge_budget = hedge_budget
+        self.fallback_deadline = fallback_deadline
+        self.cache_size = cache_size
+        self.ttft_samples = deque(maxlen=200)
+        self.answers = OrderedDict()
+        self.stats = {"calls": 0, "hedges": 0, "hedge_wins": 0, "retries": 0, "cancelled": 0, "failed_attempts": 0,
+                      "deadline_misses": 0, "fallback_model": 0, "cached": 0, "errors": 0}
+
+    def hedge_delay(self):
+        if len(self.ttft_samples) < self.min_samples:
+            delay = self.initial_hedge_delay
+        else:
+            delay = float(np.percentile(self.ttft_samples, self.hedge_percentile))
+        return min(max(delay, self.min_hedge_delay), self.ttft_timeout)
+
+    def can_hedge(self):
+        return self.stats["hedges"] < max(1.0, self.hedge_budget * self.stats["calls"])
+
+    def remember(self, key, answer):
+        self.answers[key] = answer
+        self.answers.move_to_end(key)
+        while len(self.answers) > self.cache_size:
+            self.answers.popitem(last=False)
+
+    async def first_token(self, messages, outcome):
+        loop = asyncio.get_running_loop()
+        ttft_timeout = min(self.ttft_timeout, self.deadline)
+        watchdog_at = loop.time() + ttft_timeout
+        hedge_at = loop.time() + self.hedge_delay()
+        attempts = [Attempt(self.primary, messages, "primary")]
+        extra = 0
+        error = None
+        try:
+            while True:
+                now = loop.time()
+                if extra < self.max_hedges and (not attempts or (now >= hedge_at and self.can_hedge())):
+                    source = "hedge" if attempts else "retry"
+                    attempts.append(Attempt(self.primary, messages, source))
+                    extra += 1
+                    hedge_at = now + self.hedge_delay()
+                    self.stats["hedges" if source == "hedge" else "retries"] += 1
+                    outcome["hedged"] = True
+                if not attempts:
+                    raise error
+                if now >= watchdog_at:
+                    raise LLMDeadlineExceeded(f"no first token after {ttft_timeout:.1f}s")
+
+                wake = min(watchdog_at, hedge_at) if extra < self.max_hedges and self.can_hedge() else watchdog_at
+                done, _ = await asyncio.wait([a.task for a in attempts], timeout=max(0.0, wake - now),
+                                             return_when=asyncio.FIRST_COMPLETED)
+                for attempt in [a for a in attempts if a.task in done]:
+                    attempts.remove(attempt)
+                    if attempt.task.exception() is None:
+                        self.ttft_samples.append(time.perf_counter() - attempt.start)
+                        outcome["source"] = attempt.source
+                        if attempt.source == "hedge":
+                            self.stats["hedge_wins"] += 1
+                        return attempt, attempt.task.result()
+                    error = attempt.task.exception()
+                    self.stats["failed_attempts"] += 1
+                    await attempt.close()
+        finally:
+            for attempt in attempts:
+                self.stats["cancelled"] += 1
+                await attempt.close()
+
+    async def hedged_stream(self, messages, outcome):
+        loop = asyncio.get_running_loop()
+        deadline_at = loop.time() + self.deadline
+        winner, text = await self.first_token(messages, outcome)
+        try:
+            while text is not None:
+                yield text
+                remaining = deadline_at - loop.time()
+                if remaining <= 0:
+                    raise LLMDeadlineExceeded(f"answer not finished within {self.deadline:.1f}s")
+                try:
+                    text = await asyncio.wait_for(next_text(winner.stream), remaining)
+                except asyncio.TimeoutError:
+                    raise LLMDeadlineExceeded(f"answer not finished within {self.deadline:.1f}s")
+        finally:
+            await winner.close()
+
+    async def complete(self, messages, outcome):
+        key = prompt_key(messages)
+        parts = []
+        try:
+            async for text in self.hedged_stream(messages, outcome):
+                parts.append(text)
+                yield text
+            self.remember(key, "".join(parts))
+            return
+        except Exception as e:
+            if any(parts):
+                raise
+            outcome["error"] = type(e).__name__
+            if isinstance(e, LLMDeadlineExceeded):
+                self.stats["deadline_misses"] += 1
+
+        if self.fallback is not None:
+            try:
+                message = await asyncio.wait_for(self.fallback.ainvoke(messages), self.fallback_deadline)
+            except Exception:
+                pass
+            else:
+                outcome["source"] = "fallback_model"
+                self.stats["fallback_model"] += 1
+                self.remember(key, message.content)
+                yield message.content
+                return
+
+        if key in self.answers:
+            outcome["source"] = "cached"
+            self.stats["cached"] += 1
+            yield self.answers[key]
+            return
+        raise LLMDeadlineExceeded(f"LLM call failed ({outcome['error']}) and no fallback answer is available")
+
+    async def produce(self, messages, sink):
+        self.stats["calls"] += 1
+        outcome = {"source": "primary", "hedged": False}
+        try:
+            async for text in self.complete(messages, outcome):
+                sink("chunk", text)
+        except Exception as e:
+            self.stats["errors"] += 1
+            sink("error", e)
+            return
+        sink("done", outcome)
+
+    def start(self, messages, sink):
+        return contextvars.Context().run(asyncio.run_coroutine_threadsafe, self.produce(messages, sink), background_loop())
+
+    def finish(self, outcome, result=None):
+        record("llm_source", outcome["source"])
+        record("llm_hedged", outcome["hedged"])
+        if result is not None:
+            result.update(outcome)
+
+    def stream(self, messages, outcome=None):
+        events = queue.Queue()
+        future = self.start(messages, lambda kind, value: events.put((kind, value)))
+        try:
+            while True:
+                kind, value = events.get()
+                if kind == "chunk":
+                    yield value
+                elif kind == "error":
+                    raise value
+                else:
+                    self.finish(value, outcome)
+                    return
+        finally:
+            future.cancel()
+
+    async def astream(self, messages, outcome=None):
+        loop = asyncio.get_running_loop()
+        events = asyncio.Queue()
+        future = self.start(messages, lambda kind, value: loop.call_soon_threadsafe(events.put_nowait, (kind, value)))
+        try:
+            while True:
+                kind, value = await events.get()
+                if kind == "chunk":
+                    yield value
+                elif kind == "error":
+                    raise value
+                else:
+                    self.finish(value, outcome)
+                    return
+        finally:
+            future.cancel()
+
+    def report(self):
+        s = self.stats
+        print(f"LLM calls: {s['calls']}, hedged {s['hedges']} (hedge won {s['hedge_wins']}), {s['cancelled']} attempts cancelled, "
+              f"{s['failed_attempts']} failed attempts ({s['retries']} retried), {s['deadline_misses']} deadline misses -> "
+              f"{s['fallback_model']} fallback model, {s['cached']} cached answers, {s['errors']} errors; "
+              f"hedge delay {self.hedge_delay() * 1000:.0f} ms")
+
+
+def source_metadata(outcome):
+    return {"llm_source": outcome.get("source"), "llm_hedged": outcome.get("hedged", False)}
+
+
+class HedgedChatModel(BaseChatModel):
+    client: Any
+    model_name: str = ""
+
+    @property
+    def _llm_type(self):
+        return "hedged-chat"
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        outcome = {}
+        parts = []
+        for text in self.client.stream(messages, outcome):
+            parts.append(text)
+            if run_manager:
+                run_manager.on_llm_new_token(text)
+        text = "".join(parts)
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=text, response_metadata=source_metadata(outcome)))])
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs):
+        outcome = {}
+        parts = []
+        async for text in self.client.astream(messages, outcome):
+            parts.append(text)
+            if run_manager:
+                await run_manager.on_llm_new_token(text)
+        text = "".join(parts)
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=text, response_metadata=source_metadata(outcome)))])
+
+    def _stream(self, messages, stop=None, run_manager=None, **kwargs):
+        outcome = {}
+        for text in self.client.stream(messages, outcome):
+            yield ChatGenerationChunk(message=AIMessageChunk(content=text))
+        yield ChatGenerationChunk(message=AIMessageChunk(content="", response_metadata=source_metadata(outcome)))
+
+    async def _astream(self, messages, stop=None, run_manager=None, **kwargs):
+        outcome = {}
+        async for text in self.client.astream(messages, outcome):
+            yield ChatGenerationChunk(message=AIMessageChunk(content=text))
+        yield ChatGenerationChunk(message=AIMessageChunk(content="", response_metadata=source_metadata(outcome)))
+
+def make_chat_model(model=PRIMARY_MODEL, fallback_model=FALLBACK_MODEL, deadline=30.0, **options):
+    primary = ChatOpenAI(model=model, temperature=0, max_retries=0, timeout=deadline)
+    fallback = ChatOpenAI(model=fallback_model, temperature=0, max_retries=0, timeout=deadline) if fallback_model else None
+    return HedgedChatModel(client=LLMClient(primary, fallback, deadline=deadline, **options), model_name=model)
@@ -0,0 +1,47 @@
+import threading
+import zlib
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+from bm25_index import tokenize
+
+
+def hashed_features(text):
+    tokens = tokenize(text)
+    return tokens + [f"{a} {b}" for a, b in zip(tokens, tokens[1:])]
+
+
+class HashingEmbeddings(Embeddings):
+    def __init__(self, dimensions=1024):
+        self.dimensions = dimensions
+        self.lock = threading.Lock()
+        self.stats = {"texts": 0, "calls": 0}
+
+    def embed_matrix(self, texts):
+        rows, columns, signs = [], [], []
+        for row, text in enumerate(texts):
+            hashes = np.array([zlib.crc32(f.encode("utf-8")) for f in hashed_features(text)], dtype=np.uint32)
+            rows.append(np.full(len(hashes), row, dtype=np.int64))
+            columns.append(hashes % self.dimensions)
+            signs.append(np.where(hashes & 0x80000000, -1.0, 1.0).astype(np.float32))
+
+        matrix = np.zeros((len(texts), self.dimensions), dtype=np.float32)
+        if rows:
+            np.add.at(matrix, (np.concatenate(rows), np.concatenate(columns)), np.concatenate(signs))
+        matrix = np.sign(matrix) * np.log1p(np.abs(matrix))
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+
+        with self.lock:
+            self.stats["texts"] += len(texts)
+            self.stats["calls"] += 1
+        return matrix / np.where(norms == 0, 1.0, norms)
+
+    def embed_documents(self, texts):
+        return self.embed_matrix(list(texts)).tolist()
+
+    def embed_query(self, text):
+        return self.embed_matrix([text])[0].tolist()
+
+    def report(self):
+        print(f"Local hashing embeddings ({self.dimensions} dims): {self.stats['texts']} texts in {self.stats['calls']} calls")
@@ -1,4 +1,12 @@
+import hashlib
 import json
+import os
+from collections import Counter
+
+COURSES_FILE = "ieu_courses_final.json"
+ENTITIES_FILE = "ieu_courses_normalized.json"
+MEMBERSHIP_FIELDS = ["department", "semester", "type", "url"]
+ENTITY_FIELDS = ["course_name", "ects", "local_credit", "objectives", "description", "prerequisites", "weekly_topics"]
 
 def clean_text(text):
     if not text:
@@ -7,6 +15,62 @@ def clean_text(text):
         return "; ".join([t for t in text if t])
     return str(text).strip()
 
+def canonical_value(values):
+    counts = Counter(json.dumps(v, ensure_ascii=False, sort_keys=True) for v in values)
+    best = max(counts.values())
+    return next(v for v in values if counts[json.dumps(v, ensure_ascii=False, sort_keys=True)] == best)
+
+def normalize_courses(courses):
+    rows_by_code = {}
+    for course in courses:
+        rows_by_code.setdefault(course.get("course_code", "Unknown"), []).append(course)
+
+    entities = []
+    for code, rows in rows_by_code.items():
+        entity = {"course_code": code}
+        for field in ENTITY_FIELDS:
+            entity[field] = canonical_value([row.get(field) for row in rows])
+        entity["memberships"] = []
+        for row in rows:
+            member = {field: row.get(field) for field in MEMBERSHIP_FIELDS}
+            overrides = {field: row.get(field) for field in ENTITY_FIELDS if row.get(field) != entity[field]}
+            if overrides:
+                member["overrides"] = overrides
+            entity["memberships"].append(member)
+        entities.append(entity)
+    return entities
+
+def source_hash(input_file):
+    with open(input_file, 'rb') as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+def load_entities(input_file=COURSES_FILE, entities_file=ENTITIES_FILE):
+    try:
+        with open(entities_file, 'r', encoding='utf-8') as f:
+            stored = json.load(f)
+    except (OSError, ValueError):
+        stored = None
+    if isinstance(stored, dict) and stored.get("source_sha256") == source_hash(input_file):
+        return stored["entities"]
+    return create_normalized_store(input_file, entities_file)
+
+def create_normalized_store(input_file, output_file):
+    with open(input_file, 'rb') as f:
+        data = f.read()
+    courses = json.loads(data)
+    entities = normalize_courses(courses)
+    tmp_file = output_file + ".tmp"
+    with open(tmp_file, 'w', encoding='utf-8') as f:
+        json.dump({"source_sha256": hashlib.sha256(data).hexdigest(), "entities": entities}, f, ensure_ascii=False, indent=4)
+    os.replace(tmp_file, output_file)
+
+    shared = sum(1 for e in entities if len(e["memberships"]) > 1)
+    diverging = sum(1 for e in entities if any("overrides" in m for m in e["memberships"]))
+    print(f"Normalized {len(courses)} course rows into {len(entities)} entities "
+          f"({shared} shared across departments, {diverging} with department-specific differences).")
+    print(f"Saved to: {output_file}")
+    return entities
+
 def create_rag_documents(input_file, output_file):
     try:
         with open(input_file, 'r', encoding='utf-8') as f:
@@ -59,4 +123,6 @@ def create_rag_documents(input_file, output_file):
     except Exception as e:
         print(f"Error: {e}")
 
-create_rag_documents('ieu_courses_final.json', 'ieu_rag_ready.json')
\ No newline at end of file
+if __name__ == "__main__":
+    create_normalized_store(COURSES_FILE, ENTITIES_FILE)
+    create_rag_documents(COURSES_FILE, 'ieu_rag_ready.json')
@@ -0,0 +1,196 @@
+import argparse
+import json
+import re
+import time
+
+import numpy as np
+
+from course_lookup import find_codes, normalize_code
+
+PREREQ_FILE = "prereq_graph.npz"
+
+SPLIT_PATTERN = re.compile(r"(and|or)(?=[A-Z]{2,5} ?\d{3,4})")
+REQUIREMENT_PATTERN = re.compile(r"^([A-Z]{2,5} ?\d{3,4})(.*)$", re.DOTALL)
+CHAIN_PATTERN = re.compile(r"prerequisite|need (?:to take )?before|needed before|required before|before (?:i can )?tak|requirements? for taking", re.IGNORECASE)
+UNLOCK_PATTERN = re.compile(r"unlock|open(?:s)? up|after (?:passing|taking|completing)|depend(?:s)? on|\b(?:courses?|which|what)\s+(?:that\s+|do\s+|does\s+)?(?:require|need)s?\b|prerequisite (?:to|of|for) (?:which|what)|what (?:can|could) i take", re.IGNORECASE)
+CONDITIONS = [
+    (re.compile(r"To succeed \(To get a grade of at least (\w+)\)"), "pass with at least {}"),
+    (re.compile(r"To get a grade of at least (\w+)"), "get at least {}"),
+    (re.compile(r"To attend the classes"), "attend (enrol and get a grade other than NA or W)")
+]
+
+
+def condition_text(text):
+    for pattern, template in CONDITIONS:
+        match = pattern.search(text)
+        if match:
+            return template.format(*match.groups())
+    return text.strip()
+
+
+def parse_prerequisites(text):
+    groups = []
+    notes = []
+    operator = "and"
+    for part in SPLIT_PATTERN.split((text or "").strip()):
+        if part in ("and", "or"):
+            operator = part
+            continue
+        part = part.strip()
+        if not part or part == "None":
+            continue
+        match = REQUIREMENT_PATTERN.match(part)
+        if not match:
+            notes.append(part)
+            continue
+        requirement = {"code": normalize_code(match.group(1)), "condition": condition_text(match.group(2))}
+        if operator == "or" and groups:
+            groups[-1].append(requirement)
+        else:
+            groups.append([requirement])
+    return groups, notes
+
+
+def transitive_closure(adjacency):
+    closure = adjacency.copy()
+    for k in range(len(closure)):
+        closure |= closure[:, k:k + 1] & closure[k]
+    return closure
+
+
+class PrereqGraph:
+    def __init__(self, codes, names, requirements, ancestors):
+        self.codes = codes
+        self.names = names
+        self.requirements = requirements
+        self.position = {code: i for i, code in enumerate(codes)}
+        self.ancestors = ancestors
+        self.descendants = ancestors.T.copy()
+        self.required_by = {}
+        for code in sorted(requirements):
+            for group in requirements[code]["groups"]:
+                for r in group:
+                    found = self.required_by.setdefault(r["code"], [])
+                    if code not in found:
+                        found.append(code)
+
+    @classmethod
+    def from_courses(cls, courses):
+        names = {}
+        requirements = {}
+        for course in courses:
+            code = normalize_code(course.get("course_code", ""))
+            names.setdefault(code, course.get("course_name", ""))
+            groups, notes = parse_prerequisites(course.get("prerequisites", ""))
+            if (groups or notes) and code not in requirements:
+                requirements[code] = {"groups": groups, "notes": notes}
+
+        codes = sorted(set(names) | {r["code"] for entry in requirements.values() for group in entry["groups"] for r in group})
+        position = {code: i for i, code in enumerate(codes)}
+        adjacency = np.zeros((len(codes), len(codes)), dtype=bool)
+        for code, entry in requirements.items():
+            for group in entry["groups"]:
+                for r in group:
+                    adjacency[position[code], position[r["code"]]] = True
+        return cls(codes, [names.get(code, "") for code in codes], requirements, transitive_closure(adjacency))
+
+    @classmethod
+    def from_file(cls, path):
+        with open(path, "r", encoding="utf-8") as f:
+            return cls.from_courses(json.load(f))
+
+    @classmethod
+    def load(cls, path):
+        data = np.load(path, allow_pickle=False)
+        codes = data["codes"].tolist()
+        ancestors = np.unpackbits(data["ancestors"], axis=1, count=len(codes)).astype(bool)
+        return cls(codes, data["names"].tolist(), json.loads(str(data["requirements"])), ancestors)
+
+    def save(self, path):
+        with open(path, "wb") as f:
+            np.savez_compressed(f, codes=np.array(self.codes), names=np.array(self.names),
+                                requirements=np.array(json.dumps(self.requirements, ensure_ascii=False)),
+                                ancestors=np.packbits(self.ancestors, axis=1))
+
+    def label(self, code):
+        name = self.names[self.position[code]] if code in self.position else ""
+        return f"{code} ({name})" if name else code
+
+    def all_prerequisites(self, code):
+        return [self.codes[i] for i in np.flatnonzero(self.ancestors[self.position[code]])]
+
+    def unlocks(self, code):
+        return [self.codes[i] for i in np.flatnonzero(self.descendants[self.position[code]])]
+
+    def direct_unlocks(self, code):
+        return self.required_by.get(code, [])
+
+    def describe_requirements(self, code):
+        entry = self.requirements.get(code, {"groups": [], "notes": []})
+        clauses = []
+        for group in entry["groups"]:
+            options = " or ".join(f"{self.label(r['code'])}: {r['condition']}" for r in group)
+            clauses.append(f"[{options}]" if len(group) > 1 else options)
+        return " AND ".join(clauses + entry["notes"]) or "None"
+
+    def intent(self, question):
+        if UNLOCK_PATTERN.search(question):
+            return "unlock"
+        if CHAIN_PATTERN.search(question):
+            return "chain"
+        return None
+
+    def parse_query(self, question):
+        intent = self.intent(question)
+        codes = [code for code in find_codes(question) if code in self.position]
+        if intent is None or not codes:
+            return None
+        return intent, codes
+
+    def answer(self, question):
+        query = self.parse_query(question)
+        if query is None:
+            return None
+
+        intent, codes = query
+        lines = ["Structured result computed from the prerequisite graph of all courses (not a sample):"]
+        for code in codes:
+            if intent == "chain":
+                chain = self.all_prerequisites(code)
+                lines.append(f"Direct prerequisites of {self.label(code)}: {self.describe_requirements(code)}")
+                lines.append(f"Full prerequisite chain ({len(chain)} courses, including prerequisites of prerequisites): "
+                             + (", ".join(self.label(c) for c in chain) or "None"))
+                for c in chain:
+                    if c in self.requirements:
+                        lines.append(f"- {self.label(c)} requires: {self.describe_requirements(c)}")
+            else:
+                direct = self.direct_unlocks(code)
+                unlocked = self.unlocks(code)
+                lines.append(f"Courses that list {self.label(code)} as a direct prerequisite: "
+                             + (", ".join(self.label(c) for c in direct) or "None"))
+                lines.append(f"All courses unlocked by {self.label(code)}, directly or through other courses ({len(unlocked)}): "
+                             + (", ".join(self.label(c) for c in unlocked) or "None"))
+        return "\n".join(lines)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--courses", default="ieu_courses_final.json")
+    parser.add_argument("--output", default=PREREQ_FILE)
+    parser.add_argument("question", nargs="*", help="answer a prerequisite question from the saved graph")
+    args = parser.parse_args()
+
+    if args.question:
+        graph = PrereqGraph.load(args.output)
+        question = " ".join(args.question)
+        start = time.perf_counter()
+        answer = graph.answer(question)
+        print(answer or "Not a prerequisite-chain or unlock question.")
+        print(f"\nAnswered in {(time.perf_counter() - start) * 1e6:.0f} µs")
+    else:
+        start = time.perf_counter()
+        graph = PrereqGraph.from_file(args.courses)
+        graph.save(args.output)
+        edges = sum(len(g) for entry in graph.requirements.values() for g in entry["groups"])
+        print(f"Prerequisite graph: {len(graph.codes)} courses, {edges} edges, "
+              f"{int(graph.ancestors.sum())} closure pairs, built in {time.perf_counter() - start:.3f}s -> {args.output}")
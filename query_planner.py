@@ -0,0 +1,62 @@
+import re
+from concurrent.futures import ThreadPoolExecutor
+
+from chunking import department_flag
+from course_lookup import find_departments
+from rag_metrics import stage
+from web_scraping import departments
+
+ALL_DEPARTMENTS_PATTERN = re.compile(r"\b(?:all|every|each)\s+(?:of\s+the\s+)?(?:four\s+|4\s+)?(?:engineering\s+)?departments?\b", re.IGNORECASE)
+
+
+def compared_departments(question):
+    if ALL_DEPARTMENTS_PATTERN.search(question):
+        return [dept["name"] for dept in departments]
+    found = find_departments(question)
+    return found if len(found) >= 2 else []
+
+
+class ComparisonPlanner:
+    def __init__(self, retriever, expander, packer, k=15, max_parents=6, max_tokens=3000):
+        self.retriever = retriever
+        self.expander = expander
+        self.packer = packer
+        self.k = k
+        self.max_parents = max_parents
+        self.max_tokens = max_tokens
+        self.pool = ThreadPoolExecutor(max_workers=len(departments))
+
+    def retrieve(self, question, depts):
+        with stage("embed_query"):
+            embedding = self.retriever.vector_store.embeddings.embed_query(question)
+        futures = {dept: self.pool.submit(self.retriever.search, question, embedding, {department_flag(dept): True}, self.k)
+                   for dept in depts}
+        return {dept: self.expander.expand(future.result(), self.k) for dept, future in futures.items()}
+
+    def sections(self, question, depts):
+        sides = self.retrieve(question, depts)
+        flags = [department_flag(dept) for dept in depts]
+        shared = {}
+        own = {dept: [] for dept in depts}
+        for dept in depts:
+            for doc in sides[dept]:
+                if all(doc.metadata.get(flag) for flag in flags):
+                    shared.setdefault(doc.id, doc)
+                else:
+                    own[dept].append(doc)
+
+        found = []
+        if shared:
+            found.append((f"Offered by all of: {', '.join(depts)}", list(shared.values())[:self.max_parents]))
+        for dept in depts:
+            if own[dept]:
+                found.append((f"{dept} (not offered by all compared departments)", own[dept][:self.max_parents]))
+        return found
+
+    def context(self, question, depts):
+        found = self.sections(question, depts)
+        budget = self.max_tokens // max(len(found), 1)
+        blocks = [f"Comparison of {', '.join(depts)}: courses were retrieved separately for each department."]
+        for title, docs in found:
+            blocks.append(f"=== {title} ===\n" + self.packer.pack(question, docs, budget))
+        return "\n\n".join(blocks)
@@ -0,0 +1,268 @@
+import bisect
+import contextvars
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.runnables import Runnable
+
+from embedding_scheduler import token_counter
+
+logger = logging.getLogger("rag.metrics")
+
+LATENCY_BUCKETS_MS = [1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000, 60000]
+COUNT_BUCKETS = [1, 5, 10, 20, 50, 100, 250, 500, 1000, 2000, 4000, 8000, 16000, 32000]
+MAX_SAMPLES = 10000
+
+current = contextvars.ContextVar("rag_request_metrics", default=None)
+last_request = contextvars.ContextVar("rag_last_request", default=None)
+
+
+class RequestMetrics:
+    def __init__(self, question):
+        self.question = question
+        self.start = time.perf_counter()
+        self.stages = {}
+        self.values = {}
+        self.llm_start = None
+
+    def add(self, name, seconds):
+        self.stages[name] = self.stages.get(name, 0.0) + seconds
+
+    def set(self, name, value):
+        self.values[name] = value
+
+    def as_record(self):
+        return {
+            "question": self.question,
+            "stages_ms": {name: round(seconds * 1000, 3) for name, seconds in self.stages.items()},
+            **self.values
+        }
+
+
+@contextmanager
+def stage(name):
+    metrics = current.get()
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        if metrics is not None:
+            metrics.add(name, time.perf_counter() - start)
+
+
+def record(name, value):
+    metrics = current.get()
+    if metrics is not None:
+        metrics.set(name, value)
+
+
+class Histogram:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.total = 0.0
+        self.samples = []
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.total += value
+        if len(self.samples) < MAX_SAMPLES:
+            self.samples.append(value)
+
+    def snapshot(self):
+        count = sum(self.counts)
+        return {
+            "count": count,
+            "sum": round(self.total, 3),
+            "mean": round(self.total / count, 3) if count else None,
+            "p50": round(float(np.percentile(self.samples, 50)), 3) if self.samples else None,
+            "p95": round(float(np.percentile(self.samples, 95)), 3) if self.samples else None,
+            "buckets": {str(le): c for le, c in zip(self.buckets + ["+Inf"], np.cumsum(self.counts).tolist())}
+        }
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.histograms = {}
+        self.counters = {}
+
+    def observe(self, name, value, buckets=LATENCY_BUCKETS_MS):
+        with self.lock:
+            self.histograms.setdefault(name, Histogram(buckets)).observe(value)
+
+    def increment(self, name, amount=1):
+        with self.lock:
+            self.counters[name] = self.counters.get(name, 0) + amount
+
+    def observe_request(self, metrics):
+        for name, seconds in metrics.stages.items():
+            self.observe(f"{name}_ms", seconds * 1000)
+        for name, value in metrics.values.items():
+            if isinstance(value, (int, float)) and not isinstance(value, bool):
+                self.observe(name, value, COUNT_BUCKETS)
+        self.increment("requests")
+        if "route" in metrics.values:
+            self.increment(f"route_{metrics.values['route']}")
+
+    def snapshot(self):
+        with self.lock:
+            return {
+                "counters": dict(self.counters),
+                "histograms": {name: h.snapshot() for name, h in sorted(self.histograms.items())}
+            }
+
+    def write(self, path):
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.snapshot(), f, indent=4)
+        os.replace(tmp_path, path)
+
+    def report(self):
+        snapshot = self.snapshot()
+        print(f"Requests: {snapshot['counters'].get('requests', 0)} "
+              + " ".join(f"{k}={v}" for k, v in sorted(snapshot["counters"].items()) if k.startswith("route_")))
+        print(f"{'metric':<24} {'count':>6} {'mean':>10} {'p50':>10} {'p95':>10}")
+        for name, h in snapshot["histograms"].items():
+            print(f"{name:<24} {h['count']:>6} {h['mean']:>10.1f} {h['p50']:>10.1f} {h['p95']:>10.1f}")
+
+    def serve(self, host="127.0.0.1", port=9108):
+        registry = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path != "/metrics":
+                    self.send_error(404)
+                    return
+                body = json.dumps(registry.snapshot()).encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        server = ThreadingHTTPServer((host, port), Handler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        return server
+
+
+registry = MetricsRegistry()
+
+
+class MetricsCallback(BaseCallbackHandler):
+    def __init__(self):
+        self.count_tokens = token_counter()
+
+    def on_chat_model_start(self, serialized, messages, **kwargs):
+        metrics = current.get()
+        if metrics is None:
+            return
+        metrics.llm_start = time.perf_counter()
+        metrics.set("prompt_tokens", sum(self.count_tokens(str(m.content)) for batch in messages for m in batch))
+
+    def on_llm_new_token(self, token, **kwargs):
+        metrics = current.get()
+        if metrics is not None and metrics.llm_start is not None and "llm_ttft" not in metrics.stages:
+            metrics.add("llm_ttft", time.perf_counter() - metrics.llm_start)
+
+    def on_llm_end(self, response, **kwargs):
+        metrics = current.get()
+        if metrics is None or metrics.llm_start is None:
+            return
+        metrics.add("llm", time.perf_counter() - metrics.llm_start)
+
+        text = "".join(g.text for generations in response.generations for g in generations)
+        metrics.set("completion_tokens", self.count_tokens(text))
+        usage = (response.llm_output or {}).get("token_usage") or {}
+        for generations in response.generations:
+            for g in generations:
+                message_usage = getattr(getattr(g, "message", None), "usage_metadata", None)
+                if message_usage:
+                    usage = {"prompt_tokens": message_usage["input_tokens"], "completion_tokens": message_usage["output_tokens"]}
+        if usage.get("prompt_tokens"):
+            metrics.set("prompt_tokens", usage["prompt_tokens"])
+        if usage.get("completion_tokens"):
+            metrics.set("completion_tokens", usage["completion_tokens"])
+
+
+class InstrumentedChain(Runnable):
+    def __init__(self, chain, registry=registry):
+        self.chain = chain.with_config(callbacks=[MetricsCallback()])
+        self.cache = getattr(chain, "cache", None)
+        self.registry = registry
+
+    def begin(self, question):
+        metrics = RequestMetrics(question)
+        return metrics, current.set(metrics)
+
+    def finish(self, metrics, token, error=None):
+        try:
+            current.reset(token)
+        except ValueError:
+            pass
+        metrics.add("total", time.perf_counter() - metrics.start)
+        if error is not None:
+            metrics.set("error", type(error).__name__)
+            self.registry.increment("errors")
+        self.registry.observe_request(metrics)
+        record = metrics.as_record()
+        last_request.set(record)
+        logger.info(json.dumps(record, ensure_ascii=False))
+
+    def invoke(self, question, config=None, **kwargs):
+        metrics, token = self.begin(question)
+        try:
+            answer = self.chain.invoke(question, config, **kwargs)
+        except Exception as e:
+            self.finish(metrics, token, e)
+            raise
+        self.finish(metrics, token)
+        return answer
+
+    async def ainvoke(self, question, config=None, **kwargs):
+        metrics, token = self.begin(question)
+        try:
+            answer = await self.chain.ainvoke(question, config, **kwargs)
+        except Exception as e:
+            self.finish(metrics, token, e)
+            raise
+        self.finish(metrics, token)
+        return answer
+
+    def stream(self, question, config=None, **kwargs):
+        metrics, token = self.begin(question)
+        error = None
+        try:
+            for chunk in self.chain.stream(question, config, **kwargs):
+                if "first_chunk" not in metrics.stages:
+                    metrics.add("first_chunk", time.perf_counter() - metrics.start)
+                yield chunk
+        except Exception as e:
+            error = e
+            raise
+        finally:
+            self.finish(metrics, token, error)
+
+    async def astream(self, question, config=None, **kwargs):
+        metrics, token = self.begin(question)
+        error = None
+        try:
+            async for chunk in self.chain.astream(question, config, **kwargs):
+                if "first_chunk" not in metrics.stages:
+                    metrics.add("first_chunk", time.perf_counter() - metrics.start)
+                yield chunk
+        except Exception as e:
+            error = e
+            raise
+        finally:
+            self.finish(metrics, token, error)
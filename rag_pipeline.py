@@ -0,0 +1,228 @@
+import asyncio
+import hashlib
+import os
+import time
+from langchain_chroma import Chroma
+from langchain_core.prompts import PromptTemplate
+from langchain_core.output_parsers import StrOutputParser
+from langchain_core.runnables import RunnableBranch, RunnableLambda, RunnablePassthrough
+from adaptive_depth import NO_INFORMATION, AdaptiveDepth, configured_depth
+from embedding_backends import check_index_backend, index_backend, make_embeddings
+from course_lookup import CourseLookup
+from course_table import CourseTable
+from bm25_index import BM25Index, HybridRetriever
+from chunking import ParentExpander, chunk_documents
+from prepare_data import load_entities
+from prereq_graph import PREREQ_FILE, PrereqGraph
+from vectorize_data import BM25_FILE, read_manifest
+from context_packer import ContextPacker
+from query_planner import ComparisonPlanner, compared_departments
+from flat_index import FlatIndex
+from answer_cache import AnswerCache, CachedAnswerChain
+from rag_metrics import InstrumentedChain, record, stage
+
+DB_DIR = "./ieu_course_db"
+COURSES_FILE = "ieu_courses_final.json"
+VECTOR_STORE = os.environ.get("RAG_VECTOR_STORE", "chroma")
+FLAT_DTYPE = os.environ.get("RAG_FLAT_DTYPE", "float16")
+RETRIEVAL_K = 40
+RETRIEVAL_PARENTS = 10
+CONTEXT_TOKEN_BUDGET = 6000
+DEPTH_MIN_K = 12
+DEPTH_SCORE_GAP = 0.1
+COMPARISON_K = 30
+COMPARISON_PARENTS = 6
+COMPARISON_TOKEN_BUDGET = 3000
+
+TEMPLATE = """You are an expert academic advisor for Izmir University of Economics.
+    You have access to a comprehensive list of course data below.
+    
+    Your goal is to answer the student's question by analyzing the provided Context.
+    
+    INSTRUCTIONS FOR DIFFERENT QUESTION TYPES:
+    
+    1. SPECIFIC COURSE DETAILS (e.g., "Objective of SE 311"):
+       - Search specifically for the block starting with "Code: SE 311".
+       - Do not confuse it with other courses that list SE 311 as a prerequisite.
+       - Extract the requested info (Objective, ECTS, etc.) accurately.
+
+    2. SEMESTER LISTING (e.g., "1st Semester courses"):
+       - Scan all courses in the context.
+       - Identify courses where the 'Semester' field, or the semester listed for the department under 'Offered by', explicitly matches the requested period (e.g., "1. Semester", "1. Year Fall").
+       - List all matching courses found.
+
+    3. COUNTING/QUANTITATIVE (e.g., "How many elective courses..."):
+       - If the Context starts with "Structured result", its counts and totals were computed over the full course table: use them as given instead of recounting.
+       - Otherwise, manually count the entries in the context that meet the criteria.
+       - Provide the final count and list a few examples.
+
+    4. COMPARISON (e.g., "Compare Math requirements of CE vs EEE"):
+       - Find the math courses for both departments in the context.
+       - If the Context is grouped by department ("=== ... ===" headers), compare the groups side by side; courses under "Offered by all of" are shared.
+       - Analyze and explain the differences or similarities.
+
+    5. TOPIC SEARCH (e.g., "Courses about Mechanics"):
+       - Scan descriptions and topics for the keyword.
+       - List the courses that contain this content.
+
+    6. PREREQUISITE CHAINS (e.g., "What do I need before EEE 302?", "Which courses does MATH 153 unlock?"):
+       - If the Context starts with "Structured result computed from the prerequisite graph", it already lists every direct and indirect prerequisite or unlocked course: present it as given, keeping "or" alternatives and grade conditions.
+
+    If you absolutely cannot find the answer in the context after a thorough search, state "I don't have information about that."
+
+    Context:
+    {context}
+
+    Question: {question}
+
+    Answer:
+    """
+
+def load_vector_store(store=None, flat_dtype=None):
+    manifest = read_manifest(DB_DIR)
+    check_index_backend(manifest)
+    store = store or VECTOR_STORE
+    if store == "flat":
+        return FlatIndex(DB_DIR, make_embeddings(), flat_dtype or FLAT_DTYPE, manifest.get("version"))
+    if store != "chroma":
+        raise ValueError(f"Unknown vector store '{store}' (expected chroma or flat)")
+    return Chroma(persist_directory=DB_DIR, embedding_function=make_embeddings())
+
+def load_bm25_index():
+    path = os.path.join(DB_DIR, BM25_FILE)
+    if os.path.exists(path):
+        return BM25Index.load(path)
+    documents = chunk_documents(load_entities(COURSES_FILE))
+    return BM25Index.from_documents(documents.values(), documents.keys())
+
+def load_prereq_graph():
+    path = os.path.join(DB_DIR, PREREQ_FILE)
+    if os.path.exists(path):
+        return PrereqGraph.load(path)
+    return PrereqGraph.from_file(COURSES_FILE)
+
+def answer_cache_version(llm):
+    digest = hashlib.sha256()
+    manifest = read_manifest(DB_DIR)
+    digest.update(manifest.get("version", "").encode("utf-8"))
+    digest.update(index_backend(manifest).encode("utf-8"))
+    with open(COURSES_FILE, 'rb') as f:
+        digest.update(f.read())
+    digest.update(TEMPLATE.encode("utf-8"))
+    digest.update(str(getattr(llm, "model_name", type(llm).__name__)).encode("utf-8"))
+    return digest.hexdigest()[:16]
+
+def build_rag_chain(vector_store, llm, separator="\n--- COURSE ENTRY ---\n", answer_cache=False, depth=None):
+    retriever = HybridRetriever(vector_store, load_bm25_index(), k=RETRIEVAL_K)
+    adaptive = None
+    if (depth or configured_depth()) == "adaptive":
+        adaptive = AdaptiveDepth(min_k=DEPTH_MIN_K, max_k=RETRIEVAL_K, gap=DEPTH_SCORE_GAP)
+    expander = ParentExpander(load_entities(COURSES_FILE), max_parents=RETRIEVAL_PARENTS)
+    graph = load_prereq_graph()
+    lookup = CourseLookup.from_file(COURSES_FILE)
+    table = CourseTable.from_file(COURSES_FILE)
+    packer = ContextPacker(max_tokens=CONTEXT_TOKEN_BUDGET, separator=separator)
+    planner = ComparisonPlanner(retriever, expander, packer, k=COMPARISON_K, max_parents=COMPARISON_PARENTS,
+                                max_tokens=COMPARISON_TOKEN_BUDGET)
+    prompt = PromptTemplate.from_template(TEMPLATE)
+
+    def pack(question, docs):
+        with stage("pack"):
+            context = packer.pack(question, docs)
+        record("docs_retrieved", len(docs))
+        record("context_tokens", packer.count_tokens(context))
+        return context
+
+    def build_context(question):
+        with stage("prereq_graph"):
+            structured = graph.answer(question)
+        if structured:
+            record("route", "prereq_graph")
+            record("context_tokens", packer.count_tokens(structured))
+            return structured
+        with stage("lookup"):
+            docs = lookup.find(question)
+        if docs:
+            record("route", "course_code")
+            return pack(question, docs)
+        with stage("table"):
+            structured = table.answer(question)
+        if structured:
+            record("route", "table")
+            record("context_tokens", packer.count_tokens(structured))
+            return structured
+        depts = compared_departments(question)
+        if depts:
+            record("route", "comparison")
+            with stage("compare"):
+                context = planner.context(question, depts)
+            record("context_tokens", packer.count_tokens(context))
+            return context
+        if adaptive is None:
+            record("route", "retrieval")
+            with stage("retrieve"):
+                docs = expander.expand(retriever.invoke(question))
+            return pack(question, docs)
+
+        with stage("embed_query"):
+            embedding = vector_store.embeddings.embed_query(question)
+        with stage("depth"):
+            k = adaptive.depth(vector_store, embedding)
+        record("retrieval_depth", k)
+        if k == 0:
+            record("route", "no_match")
+            return None
+        record("route", "retrieval")
+        with stage("retrieve"):
+            docs = expander.expand(retriever.search(question, embedding, k=k))
+        return pack(question, docs)
+
+    chain = (
+        {"context": RunnableLambda(build_context), "question": RunnablePassthrough()}
+        | RunnableBranch(
+            (lambda x: x["context"] is None, RunnableLambda(lambda x: NO_INFORMATION)),
+            prompt | llm | StrOutputParser()
+        )
+    )
+    if answer_cache:
+        chain = CachedAnswerChain(chain, AnswerCache(vector_store.embeddings, answer_cache_version(llm)))
+    chain = InstrumentedChain(chain)
+
+    def prefetch(questions):
+        if adaptive is not None:
+            return 0
+        needs_retrieval = [q for q in questions if graph.parse_query(q) is None and not lookup.find_courses(q) and table.parse_query(q) is None
+                           and not compared_departments(q)]
+        if needs_retrieval:
+            retriever.prefetch(needs_retrieval)
+        return len(needs_retrieval)
+
+    chain.prefetch = prefetch
+    return chain
+
+async def answer_batch(rag_chain, questions, max_concurrency=8, slots=None):
+    start = time.perf_counter()
+    prefetched = await asyncio.get_running_loop().run_in_executor(None, rag_chain.prefetch, questions)
+    prefetch_seconds = time.perf_counter() - start
+    slots = slots or asyncio.Semaphore(max_concurrency)
+
+    async def ask(question):
+        t = time.perf_counter()
+        try:
+            await slots.acquire()
+            t = time.perf_counter()
+            try:
+                answer = await rag_chain.ainvoke(question)
+            finally:
+                slots.release()
+        except Exception as e:
+            answer = f"ERROR: {str(e)}"
+        return {"question": question, "answer": answer, "seconds": round(time.perf_counter() - t, 3)}
+
+    answers = await asyncio.gather(*(ask(q) for q in questions))
+    return {
+        "answers": answers,
+        "prefetched": prefetched,
+        "prefetch_seconds": round(prefetch_seconds, 3),
+        "seconds": round(time.perf_counter() - start, 3)
+    }
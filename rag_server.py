@@ -0,0 +1,255 @@
+import argparse
+import asyncio
+import json
+import logging
+import os
+import time
+from urllib.parse import parse_qs, urlsplit
+
+from langchain_core.language_models.fake_chat_models import FakeListChatModel
+from llm_client import make_chat_model
+from rag_metrics import registry
+from rag_pipeline import answer_batch, build_rag_chain, load_vector_store
+
+os.environ["OPENAI_API_KEY"] = "key"
+
+logger = logging.getLogger("rag.server")
+
+MAX_BODY_BYTES = 64 * 1024
+MAX_BATCH = 64
+REASONS = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed",
+           413: "Payload Too Large", 500: "Internal Server Error", 503: "Service Unavailable"}
+
+
+class HttpError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+class RagServer:
+    def __init__(self, max_in_flight=8, max_queue=64, fake_llm=False, fake_llm_delay=0.01, answer_cache=True):
+        self.max_in_flight = max_in_flight
+        self.max_queue = max_queue
+        self.fake_llm = fake_llm
+        self.fake_llm_delay = fake_llm_delay
+        self.answer_cache = answer_cache
+        self.slots = None
+        self.chain = None
+        self.ready = False
+        self.load_error = None
+        self.stats = {"in_flight": 0, "queued": 0, "served": 0, "rejected": 0, "errors": 0}
+
+    def make_llm(self):
+        if self.fake_llm:
+            return FakeListChatModel(responses=["This is a canned answer from the fake LLM."], sleep=self.fake_llm_delay)
+        return make_chat_model()
+
+    def build(self):
+        vector_store = load_vector_store()
+        return build_rag_chain(vector_store, self.make_llm(), answer_cache=self.answer_cache)
+
+    async def load(self):
+        start = time.perf_counter()
+        try:
+            self.chain = await asyncio.get_running_loop().run_in_executor(None, self.build)
+        except Exception as e:
+            self.load_error = str(e)
+            logger.error("warm-up failed: %s", e)
+            return
+        self.ready = True
+        logger.info("warm state loaded in %.2fs", time.perf_counter() - start)
+
+    async def acquire(self):
+        if self.stats["queued"] >= self.max_queue:
+            self.stats["rejected"] += 1
+            raise HttpError(503, "Too many requests queued, retry later")
+        self.stats["queued"] += 1
+        try:
+            await self.slots.acquire()
+        finally:
+            self.stats["queued"] -= 1
+        self.stats["in_flight"] += 1
+
+    def release(self):
+        self.stats["in_flight"] -= 1
+        self.slots.release()
+
+    async def read_request(self, reader):
+        request_line = (await reader.readline()).decode("latin-1").strip()
+        if not request_line:
+            return None
+        method, target, _ = request_line.split(" ", 2)
+        headers = {}
+        while True:
+            line = (await reader.readline()).decode("latin-1").strip()
+            if not line:
+                break
+            name, _, value = line.partition(":")
+            headers[name.strip().lower()] = value.strip()
+
+        length = int(headers.get("content-length", 0))
+        if length > MAX_BODY_BYTES:
+            raise HttpError(413, "Request body too large")
+        body = await reader.readexactly(length) if length else b""
+        url = urlsplit(target)
+        return method, url.path, parse_qs(url.query), headers, body
+
+    async def send_json(self, writer, status, payload):
+        body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        writer.write(
+            f"HTTP/1.1 {status} {REASONS.get(status, '')}\r\n"
+            f"Content-Type: application/json\r\nContent-Length: {len(body)}\r\nConnection: close\r\n\r\n".encode("latin-1")
+            + body
+        )
+        await writer.drain()
+
+    def question_from(self, query, body):
+        question = (query.get("q") or [""])[0]
+        if body:
+            try:
+                question = json.loads(body).get("question", question)
+            except (ValueError, AttributeError):
+                raise HttpError(400, "Body must be a JSON object with a 'question' field")
+        question = (question or "").strip()
+        if not question:
+            raise HttpError(400, "Missing question")
+        return question
+
+    def questions_from(self, body):
+        try:
+            questions = json.loads(body or b"{}").get("questions")
+        except (ValueError, AttributeError):
+            raise HttpError(400, "Body must be a JSON object with a 'questions' list")
+        if not isinstance(questions, list) or not questions:
+            raise HttpError(400, "Missing questions")
+        if len(questions) > MAX_BATCH:
+            raise HttpError(413, f"At most {MAX_BATCH} questions per batch")
+        questions = [str(q).strip() for q in questions]
+        if not all(questions):
+            raise HttpError(400, "Empty question in batch")
+        return questions
+
+    async def ask_batch(self, writer, questions):
+        waiting = len(questions) - (self.max_in_flight - self.stats["in_flight"])
+        if self.stats["queued"] + max(0, waiting) > self.max_queue:
+            self.stats["rejected"] += 1
+            raise HttpError(503, "Too many requests queued, retry later")
+        result = await answer_batch(self.chain, questions, slots=self)
+        self.stats["served"] += sum(not a["answer"].startswith("ERROR:") for a in result["answers"])
+        await self.send_json(writer, 200, result)
+
+    async def ask(self, writer, question):
+        await self.acquire()
+        start = time.perf_counter()
+        try:
+            answer = await self.chain.ainvoke(question)
+        finally:
+            self.release()
+        self.stats["served"] += 1
+        await self.send_json(writer, 200, {"question": question, "answer": answer,
+                                           "seconds": round(time.perf_counter() - start, 3)})
+
+    async def stream(self, writer, question):
+        await self.acquire()
+        start = time.perf_counter()
+        try:
+            writer.write(b"HTTP/1.1 200 OK\r\nContent-Type: text/event-stream\r\nCache-Control: no-cache\r\nConnection: close\r\n\r\n")
+            await writer.drain()
+            try:
+                async for chunk in self.chain.astream(question):
+                    if not chunk:
+                        continue
+                    writer.write(f"data: {json.dumps({'text': chunk}, ensure_ascii=False)}\n\n".encode("utf-8"))
+                    await writer.drain()
+            except (ConnectionError, asyncio.CancelledError):
+                raise
+            except Exception as e:
+                self.stats["errors"] += 1
+                writer.write(f"event: error\ndata: {json.dumps({'error': str(e)})}\n\n".encode("utf-8"))
+                return
+            self.stats["served"] += 1
+            writer.write(f"event: done\ndata: {json.dumps({'seconds': round(time.perf_counter() - start, 3)})}\n\n".encode("utf-8"))
+            await writer.drain()
+        finally:
+            self.release()
+
+    async def handle(self, reader, writer):
+        try:
+            request = await self.read_request(reader)
+            if request is None:
+                return
+            method, path, query, headers, body = request
+
+            if path == "/healthz":
+                await self.send_json(writer, 200, {"status": "ok"})
+            elif path == "/readyz":
+                status = 200 if self.ready else 503
+                await self.send_json(writer, status, {"ready": self.ready, "error": self.load_error})
+            elif path == "/stats":
+                await self.send_json(writer, 200, dict(self.stats, ready=self.ready, max_in_flight=self.max_in_flight,
+                                                       max_queue=self.max_queue))
+            elif path == "/metrics":
+                await self.send_json(writer, 200, registry.snapshot())
+            elif path == "/ask/batch":
+                if method != "POST":
+                    raise HttpError(405, "Use POST")
+                if not self.ready:
+                    raise HttpError(503, self.load_error or "Warming up, retry later")
+                await self.ask_batch(writer, self.questions_from(body))
+            elif path in ("/ask", "/ask/stream"):
+                if method not in ("GET", "POST"):
+                    raise HttpError(405, "Use GET or POST")
+                if not self.ready:
+                    raise HttpError(503, self.load_error or "Warming up, retry later")
+                question = self.question_from(query, body)
+                wants_stream = path == "/ask/stream" or "text/event-stream" in headers.get("accept", "")
+                if wants_stream:
+                    await self.stream(writer, question)
+                else:
+                    await self.ask(writer, question)
+            else:
+                raise HttpError(404, "Not found")
+        except HttpError as e:
+            await self.send_json(writer, e.status, {"error": str(e)})
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        except Exception as e:
+            self.stats["errors"] += 1
+            logger.exception("request failed")
+            try:
+                await self.send_json(writer, 500, {"error": str(e)})
+            except ConnectionError:
+                pass
+        finally:
+            writer.close()
+
+    async def serve(self, host="127.0.0.1", port=8000):
+        self.slots = asyncio.Semaphore(self.max_in_flight)
+        server = await asyncio.start_server(self.handle, host, port)
+        print(f"Serving RAG API on http://{host}:{port} (POST /ask, /ask/stream, /ask/batch; GET /healthz, /readyz, /stats, /metrics)")
+        asyncio.get_running_loop().create_task(self.load())
+        async with server:
+            await server.serve_forever()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--max-in-flight", type=int, default=8, help="concurrent requests allowed through the chain and LLM")
+    parser.add_argument("--max-queue", type=int, default=64, help="requests allowed to wait for a slot before answering 503")
+    parser.add_argument("--fake-llm", action="store_true", help="answer with a local fake chat model instead of OpenAI")
+    parser.add_argument("--fake-llm-delay", type=float, default=0.01, help="seconds between streamed characters of the fake LLM")
+    parser.add_argument("--no-answer-cache", action="store_true")
+    args = parser.parse_args()
+
+    logging.basicConfig(format="%(asctime)s %(name)s %(message)s")
+    logging.getLogger("rag").setLevel(logging.INFO)
+
+    server = RagServer(max_in_flight=args.max_in_flight, max_queue=args.max_queue, fake_llm=args.fake_llm,
+                       fake_llm_delay=args.fake_llm_delay, answer_cache=not args.no_answer_cache)
+    try:
+        asyncio.run(server.serve(args.host, args.port))
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,286 @@
+import argparse
+import json
+import logging
+import re
+import time
+
+import numpy as np
+from langchain_chroma import Chroma
+
+from adaptive_depth import AdaptiveDepth, cosine_scores, score_floor
+from bm25_index import BM25Index, HybridRetriever
+from chunking import ParentExpander, chunk_documents
+from context_packer import ContextPacker
+from course_lookup import CourseLookup
+from course_table import SEMESTER_PATTERN, CourseTable
+from embedding_scheduler import token_counter
+from embedding_backends import make_embeddings
+from query_planner import ComparisonPlanner, compared_departments
+from rag_pipeline import (COMPARISON_K, COMPARISON_PARENTS, COMPARISON_TOKEN_BUDGET, COURSES_FILE, DEPTH_MIN_K, DEPTH_SCORE_GAP,
+                          RETRIEVAL_K, load_vector_store)
+from prepare_data import normalize_courses
+from prereq_graph import PrereqGraph
+from test_runner import categories
+
+logging.getLogger("rag").setLevel(logging.WARNING)
+
+SE = "Software Engineering"
+CE = "Computer Engineering"
+EEE = "Electrical and Electronics Engineering"
+IE = "Industrial Engineering"
+
+GOLD_SPECS = {
+    "What are the mandatory courses offered in the 1st year fall semester of Software Engineering?": {"dept": [SE], "year": 1, "term": "Fall", "types": ["Mandatory"]},
+    "What is the main objective of the course SE 311 (Software Architecture)?": {"dept": [SE], "codes": ["SE 311"]},
+    "What are the weekly topics for the course code CE 323?": {"dept": [CE], "codes": ["CE 323"]},
+    "How many ECTS credits is the IE 326 (Inventory Planning) course in Industrial Engineering?": {"dept": [IE], "codes": ["IE 326"]},
+    "What are the prerequisites for the course EEE 208 (Electric Circuit Analysis II)?": {"dept": [EEE], "codes": ["EEE 208"]},
+    "Which physics courses are required for the Computer Engineering department?": {"dept": [CE], "prefix": "PHYS"},
+    "Does the Software Engineering department offer a course on 'Mobile Application Development'?": {"dept": [SE], "name": "mobile application development"},
+    "What is the description of the senior project course (FENG 498) in Software Engineering?": {"dept": [SE], "codes": ["FENG 498"]},
+    "In which semester is the MATH 153 (Calculus I) course taken by Industrial Engineering students?": {"dept": [IE], "codes": ["MATH 153"]},
+    "What are the POOL 003 courses mentioned for Electrical and Electronics Engineering?": {"dept": [EEE], "semester": "From Pool 003"},
+
+    "Which engineering departments offer courses related to 'Artificial Intelligence' or 'Machine Learning'?": {"name": "artificial intelligence|machine learning"},
+    "Find courses across all departments that cover 'Probability' and 'Statistics'.": {"name": "probability|statistic"},
+    "Which courses include 'Java' programming in their weekly topics or description?": {"text": r"\bjava\b"},
+    "Are there any courses related to 'Signal Processing' in the Faculty of Engineering?": {"name": "signal"},
+    "Which departments require an 'Occupational Health and Safety' course?": {"name": "occupational health"},
+    "Find courses that focus on 'Database Management' systems.": {"name": "database"},
+    "Which courses cover 'Optimization' techniques?": {"name": "optimization"},
+    "Are there any courses regarding 'Computer Networks' or 'Network Security'?": {"name": "computer networks|network security"},
+    "Which courses discuss 'Economics'?": {"name": "econom"},
+    "Which courses cover topics related to 'Statics' ?": {"text": r"\bstatics\b"},
+
+    "What are the common 1st yearcourses between Software Engineering and Industrial Engineering?": {"dept": [SE, IE], "year": 1, "common": True},
+    "Compare the electric requirements for Computer Engineering and Electrical-Electronics Engineering?": {"dept": [CE, EEE], "name": "electric|circuit"},
+    "Which department focuses more on 'Hardware' and 'Circuits': Software Engineering or Electrical-Electronics Engineering?": {"dept": [SE, EEE], "name": "circuit|hardware|logic design|microprocessor|electronic"},
+    "Do both Computer Engineering and Software Engineering students take the 'Introduction to Programming II' course?": {"dept": [CE, SE], "name": "introduction to programming ii$"},
+    "Is the internship (Summer Practice) duration or ECTS the same for all engineering departments?": {"name": "summer training"},
+    "Which department emphasizes 'Data Science' more: Industrial Engineering or Computer Engineering?": {"dept": [IE, CE], "name": "data science|data mining"},
+    "Are the 'Calculus' (Math) courses the same for all four engineering departments?": {"prefix": "MATH", "name": "calculus"},
+    "List the programming-focused courses in Software Engineering versus Industrial Engineering.": {"dept": [SE, IE], "name": "programming"},
+    "Do all departments take the same 'Academic Skills in English' (ENG 101/102) courses?": {"codes": ["ENG 101", "ENG 102"]},
+    "Is there a difference in the ECTS value of the Multidisciplinary Engineering Projects between SE and EEE?": {"dept": [SE, EEE], "codes": ["FENG 497"]},
+
+    "How many ECTS credits is the 'Introduction to Programming' course?": {"name": "^introduction to programming"},
+    "How many elective courses must a Software Engineering student take in the 4. Year Fall Semester?": {"dept": [SE], "year": 4, "term": "Fall", "types": ["Elective", "Elective - Placeholder"]},
+    "What is the total ECTS value of the first semester for Computer Engineering?": {"dept": [CE], "year": 1, "term": "Fall"},
+    "How many physics courses are mandatory in the Electrical-Electronics Engineering curriculum?": {"dept": [EEE], "prefix": "PHYS", "types": ["Mandatory"]},
+    "What is the semester with the highest number of mandatory courses in Industrial Engineering?": {"dept": [IE], "types": ["Mandatory"]},
+    "How many 'Elective' courses are required in the Software Engineering curriculum?": {"dept": [SE], "types": ["Elective", "Elective - Placeholder"]},
+    "What is the total duration (in weeks) of the syllabus for SE 302?": {"codes": ["SE 302"]},
+    "How many different 'SFL' courses are listed in the database?": {"prefix": "SFL"},
+    "What is the total ECTS of the courses that have code as MATH in Industrial Engineering?": {"dept": [IE], "prefix": "MATH"},
+    "How many internship (summer practice) courses are there in the Software Engineering curriculum?": {"dept": [SE], "name": "summer training"}
+}
+
+
+def matches(course, spec):
+    match = SEMESTER_PATTERN.search(course.get("semester", ""))
+    year = int(match.group(1)) if match else 0
+    term = match.group(2).title() if match else ""
+    code = course.get("course_code", "")
+    text = " ".join([course.get("course_name", ""), course.get("description", ""), str(course.get("weekly_topics", ""))])
+
+    checks = [
+        "dept" not in spec or course.get("department") in spec["dept"],
+        "codes" not in spec or code in spec["codes"],
+        "year" not in spec or year == spec["year"],
+        "term" not in spec or term == spec["term"],
+        "types" not in spec or course.get("type") in spec["types"],
+        "prefix" not in spec or code.split(" ")[0] == spec["prefix"],
+        "semester" not in spec or course.get("semester") == spec["semester"],
+        "name" not in spec or re.search(spec["name"], course.get("course_name", "").lower()),
+        "text" not in spec or re.search(spec["text"], text.lower())
+    ]
+    return all(checks)
+
+
+def gold_ids(courses, spec):
+    selected = [c for c in courses if matches(c, spec)]
+    if spec.get("common"):
+        codes_by_dept = [{c["course_code"] for c in selected if c["department"] == d} for d in spec["dept"]]
+        shared = set.intersection(*codes_by_dept)
+        selected = [c for c in selected if c["course_code"] in shared]
+    return {c["course_code"] for c in selected}
+
+
+def percentile(values, q):
+    return float(np.percentile(values, q)) if values else None
+
+
+def mean(values):
+    return float(np.mean(values)) if values else None
+
+
+class Benchmark:
+    def __init__(self, courses, vector_store, ks=(5, 10, 20), token_budget=6000, chunk_k=RETRIEVAL_K, floor=None):
+        self.courses = courses
+        self.ks = sorted(ks)
+        self.chunk_k = chunk_k
+        entities = normalize_courses(courses)
+        documents = chunk_documents(entities)
+        self.bm25 = BM25Index.from_documents(documents.values(), documents.keys())
+        self.vector_store = vector_store
+        self.hybrid = HybridRetriever(vector_store, self.bm25, k=chunk_k, fetch_k=2 * chunk_k)
+        self.expander = ParentExpander(entities, max_parents=self.ks[-1])
+        self.adaptive = AdaptiveDepth(min_k=DEPTH_MIN_K, max_k=chunk_k, floor=floor, gap=DEPTH_SCORE_GAP)
+        self.lookup = CourseLookup(courses)
+        self.table = CourseTable(courses)
+        self.graph = PrereqGraph.from_courses(courses)
+        self.packer = ContextPacker(max_tokens=token_budget)
+        self.planner = ComparisonPlanner(self.hybrid, self.expander, self.packer, k=COMPARISON_K,
+                                         max_parents=COMPARISON_PARENTS, max_tokens=COMPARISON_TOKEN_BUDGET)
+        self.count_tokens = token_counter()
+
+    def documents_for(self, codes):
+        return [self.lookup.documents[code] for code in dict.fromkeys(codes) if code in self.lookup.documents]
+
+    def structured(self, question):
+        query = self.graph.parse_query(question)
+        if query is not None:
+            intent, codes = query
+            related = self.graph.all_prerequisites if intent == "chain" else self.graph.unlocks
+            return "prereq_graph", self.documents_for(codes + [c for code in codes for c in related(code)])
+        docs = self.lookup.find(question)
+        if docs:
+            return "course_code", docs
+        filters = self.table.parse_query(question)
+        if filters is not None:
+            return "table", self.documents_for(self.table.code[self.table.mask(**filters)].tolist())
+        depts = compared_departments(question)
+        if depts:
+            return "comparison", [doc for _, docs in self.planner.sections(question, depts) for doc in docs]
+        return None, None
+
+    def retrieve(self, mode, question):
+        if mode in ("routed", "adaptive"):
+            route, docs = self.structured(question)
+            if route:
+                return route, None, docs
+        if mode == "vector":
+            chunks = self.vector_store.similarity_search(question, k=self.chunk_k)
+        elif mode == "bm25":
+            chunks = [self.bm25.document(i) for i, _ in self.bm25.search(question, k=self.chunk_k)]
+        elif mode == "adaptive":
+            embedding = self.vector_store.embeddings.embed_query(question)
+            scores = cosine_scores(self.vector_store, embedding, self.adaptive.max_k)
+            k = self.adaptive.cut(scores)
+            top_score = scores[0] if scores else None
+            if k == 0:
+                return "no_match", top_score, []
+            return "retrieval", top_score, self.expander.expand(self.hybrid.search(question, embedding, k=k))
+        else:
+            chunks = self.hybrid.invoke(question)
+        return "retrieval", None, self.expander.expand(chunks)
+
+    def run_question(self, mode, question, gold):
+        start = time.perf_counter()
+        route, top_score, docs = self.retrieve(mode, question)
+        latency = (time.perf_counter() - start) * 1000
+
+        ranked = [d.id or d.metadata.get("code") for d in docs]
+        result = {
+            "question": question,
+            "route": route,
+            "gold": len(gold),
+            "retrieved": ranked,
+            "latency_ms": round(latency, 3),
+            "retrieved_tokens": sum(self.count_tokens(d.page_content) for d in docs),
+            "packed_tokens": self.count_tokens(self.packer.pack(question, docs))
+        }
+        if top_score is not None:
+            result["top_score"] = round(top_score, 4)
+        if gold:
+            for k in self.ks:
+                result[f"recall@{k}"] = len(gold & set(ranked[:k])) / len(gold)
+            first = next((rank for rank, doc_id in enumerate(ranked, 1) if doc_id in gold), None)
+            result["mrr"] = 1.0 / first if first else 0.0
+        return result
+
+    def run(self, modes):
+        report = {"ks": self.ks, "chunk_k": self.chunk_k, "documents": len(self.bm25.ids), "score_floor": self.adaptive.floor,
+                  "modes": {}}
+        for mode in modes:
+            report["modes"][mode] = {}
+            for category_name, questions_list in categories.items():
+                results = []
+                for q in questions_list:
+                    spec = GOLD_SPECS.get(q)
+                    results.append(self.run_question(mode, q, gold_ids(self.courses, spec) if spec else set()))
+
+                scored = [r for r in results if "mrr" in r]
+                latencies = [r["latency_ms"] for r in results]
+                summary = {
+                    "questions": len(results),
+                    "scored": len(scored),
+                    "no_match": sum(r["route"] == "no_match" for r in results),
+                    "mrr": mean([r["mrr"] for r in scored]),
+                    "retrieved_tokens": mean([r["retrieved_tokens"] for r in results]),
+                    "packed_tokens": mean([r["packed_tokens"] for r in results]),
+                    "latency_p50_ms": percentile(latencies, 50),
+                    "latency_p95_ms": percentile(latencies, 95)
+                }
+                for k in self.ks:
+                    summary[f"recall@{k}"] = mean([r[f"recall@{k}"] for r in scored])
+                report["modes"][mode][category_name] = {"summary": summary, "questions": results}
+        return report
+
+
+def print_report(report):
+    ks = report["ks"]
+    header = f"{'mode':<8} {'category':<40} " + " ".join(f"{'R@' + str(k):>6}" for k in ks) + f" {'MRR':>6} {'tokens':>7} {'p50ms':>7} {'p95ms':>7} {'nomatch':>7}"
+    print(header)
+    for mode, by_category in report["modes"].items():
+        for category_name, data in by_category.items():
+            s = data["summary"]
+            recalls = " ".join("     -" if s[f"recall@{k}"] is None else f"{s[f'recall@{k}']:>6.2f}" for k in ks)
+            mrr = "     -" if s["mrr"] is None else f"{s['mrr']:>6.2f}"
+            print(f"{mode:<8} {category_name[:40]:<40} {recalls} {mrr} {s['packed_tokens']:>7.0f} "
+                  f"{s['latency_p50_ms']:>7.2f} {s['latency_p95_ms']:>7.2f} {s['no_match']:>7}")
+
+    if "adaptive" in report["modes"]:
+        trap, answerable = [], []
+        for category_name, data in report["modes"]["adaptive"].items():
+            scores = [r["top_score"] for r in data["questions"] if "top_score" in r]
+            (trap if category_name.startswith("E)") else answerable).extend(scores)
+        floor = report["score_floor"]
+        print(f"\nScore floor {floor:g}: {sum(s < floor for s in trap)}/{len(trap)} trap and "
+              f"{sum(s < floor for s in answerable)}/{len(answerable)} answerable questions reaching the floor check cut off; "
+              f"answerable top scores >= {min(answerable, default=float('nan')):.3f}, trap top scores <= {max(trap, default=float('nan')):.3f}")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--modes", default="vector,bm25,hybrid,adaptive,routed")
+    parser.add_argument("--k", default="5,10,20", help="parent courses scored for recall@k")
+    parser.add_argument("--chunk-k", type=int, default=RETRIEVAL_K, help="chunks retrieved before expanding to parent courses")
+    parser.add_argument("--store", choices=["local", "db", "flat"], default="local")
+    parser.add_argument("--output", default="benchmark_results.json")
+    args = parser.parse_args()
+
+    with open(COURSES_FILE, "r", encoding="utf-8") as f:
+        courses = json.load(f)
+
+    if args.store in ("db", "flat"):
+        vector_store = load_vector_store(store="flat" if args.store == "flat" else "chroma")
+    else:
+        documents = chunk_documents(normalize_courses(courses))
+        vector_store = Chroma(collection_name="retrieval_benchmark", embedding_function=make_embeddings("hashing"),
+                              collection_metadata={"hnsw:construction_ef": 200, "hnsw:search_ef": 200})
+        vector_store.add_documents(documents=list(documents.values()), ids=list(documents.keys()))
+
+    floor = score_floor("hashing") if args.store == "local" else None
+    benchmark = Benchmark(courses, vector_store, ks=[int(k) for k in args.k.split(",")], chunk_k=args.chunk_k, floor=floor)
+    report = benchmark.run(args.modes.split(","))
+    report["store"] = args.store
+
+    print_report(report)
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=4)
+    print(f"Results saved to '{args.output}'.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,145 @@
+import hashlib
+import json
+import os
+import threading
+import time
+import zipfile
+from concurrent.futures import Future
+
+MANIFEST = "manifest.json"
+
+
+def page_name(url):
+    return "pages/" + hashlib.sha1(url.encode("utf-8")).hexdigest() + ".html"
+
+
+class SnapshotWriter:
+    def __init__(self, path, base_url, resume=False):
+        self.path = path
+        self.journal_path = path + ".journal"
+        self.lock = threading.Lock()
+        self.manifest = {"base_url": base_url, "created_at": time.time(), "complete": False, "pages": {}}
+        self.previous = None
+        self.journaled = {}
+
+        replay = resume and os.path.exists(self.journal_path)
+        uses_previous = resume and os.path.exists(path)
+        if replay:
+            with open(self.journal_path, "rb") as f:
+                uses_previous = uses_previous and json.loads(f.readline() or b"{}").get("previous", False)
+        if uses_previous:
+            try:
+                self.previous = zipfile.ZipFile(path, "r")
+                self.manifest["pages"].update(json.loads(self.previous.read(MANIFEST))["pages"])
+            except (zipfile.BadZipFile, KeyError, ValueError):
+                self.previous = None
+                print(f"Warning: '{path}' is unreadable, its pages will be missing from the archive.")
+        if replay:
+            self.replay_journal()
+        else:
+            with open(self.journal_path, "wb") as f:
+                f.write(json.dumps({"previous": self.previous is not None}).encode("utf-8") + b"\n")
+        self.journal = open(self.journal_path, "ab")
+
+    def replay_journal(self):
+        with open(self.journal_path, "rb") as f:
+            f.readline()
+            good_bytes = f.tell()
+            while True:
+                header = f.readline()
+                if not header.endswith(b"\n"):
+                    break
+                try:
+                    entry = json.loads(header)
+                except ValueError:
+                    break
+                body = f.read(entry["size"])
+                if len(body) < entry["size"]:
+                    break
+                good_bytes = f.tell()
+                self.manifest["pages"][entry["url"]] = {"name": page_name(entry["url"]), "kind": entry["kind"]}
+                self.journaled[entry["url"]] = (good_bytes - entry["size"], entry["size"])
+        with open(self.journal_path, "r+b") as f:
+            f.truncate(good_bytes)
+        print(f"Snapshot journal: recovered {len(self.journaled)} pages from the interrupted run.")
+
+    def add(self, url, kind, body):
+        with self.lock:
+            if url in self.manifest["pages"]:
+                return
+            header = json.dumps({"url": url, "kind": kind, "size": len(body)}, ensure_ascii=False).encode("utf-8") + b"\n"
+            self.journal.write(header)
+            offset = self.journal.tell()
+            self.journal.write(body)
+            self.journal.flush()
+            self.journaled[url] = (offset, len(body))
+            self.manifest["pages"][url] = {"name": page_name(url), "kind": kind}
+
+    def close(self, complete=True):
+        with self.lock:
+            self.journal.close()
+            self.manifest["complete"] = complete
+            tmp_path = self.path + ".tmp"
+            with open(self.journal_path, "rb") as journal, \
+                    zipfile.ZipFile(tmp_path, "w", compression=zipfile.ZIP_DEFLATED, compresslevel=6) as out:
+                for url, page in self.manifest["pages"].items():
+                    if url in self.journaled:
+                        offset, size = self.journaled[url]
+                        journal.seek(offset)
+                        out.writestr(page["name"], journal.read(size))
+                    else:
+                        out.writestr(page["name"], self.previous.read(page["name"]))
+                out.writestr(MANIFEST, json.dumps(self.manifest, ensure_ascii=False))
+            if self.previous:
+                self.previous.close()
+            os.replace(tmp_path, self.path)
+            os.remove(self.journal_path)
+        state = "complete" if complete else "incomplete, continue with --resume"
+        print(f"Archived {len(self.manifest['pages'])} pages to '{self.path}' ({state}).")
+
+
+class SnapshotReader:
+    def __init__(self, path):
+        self.path = path
+        self.zip = zipfile.ZipFile(path, "r")
+        self.manifest = json.loads(self.zip.read(MANIFEST))
+        self.pages = self.manifest["pages"]
+        self.missing = 0
+
+    def urls(self, kind=None):
+        return [url for url, page in self.pages.items() if kind is None or page["kind"] == kind]
+
+    def read(self, url):
+        return self.zip.read(self.pages[url]["name"])
+
+    def fetch(self, url):
+        if url not in self.pages:
+            self.missing += 1
+            raise KeyError(f"Not in snapshot archive: {url}")
+        return self.read(url)
+
+    def submit(self, fn, *args, **kwargs):
+        future = Future()
+        try:
+            future.set_result(fn(*args, **kwargs))
+        except Exception as e:
+            future.set_exception(e)
+        return future
+
+    def close(self):
+        self.zip.close()
+
+    def report(self):
+        print(f"Snapshot archive: {len(self.pages)} pages, {self.missing} requested pages missing")
+
+
+worker_reader = None
+
+
+def open_worker_reader(path):
+    global worker_reader
+    worker_reader = SnapshotReader(path)
+
+
+def read_snapshot(url):
+    return worker_reader.read(url)
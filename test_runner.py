@@ -1,17 +1,22 @@
 import os
 import sys
+import time
+import asyncio
+import argparse
+import logging
 import json
-from langchain_chroma import Chroma
-from langchain_openai import OpenAIEmbeddings, ChatOpenAI
-from langchain_core.prompts import PromptTemplate
-from langchain_core.output_parsers import StrOutputParser
-from langchain_core.runnables import RunnablePassthrough
+from llm_client import FALLBACK_MODEL, make_chat_model
+from rag_pipeline import DB_DIR, build_rag_chain, load_vector_store
+from rag_metrics import last_request, registry
 
 os.environ["OPENAI_API_KEY"] = "key"
 
 if "OPENAI_API_KEY" not in os.environ:
     sys.exit()
 
+logging.basicConfig(format="%(asctime)s %(name)s %(message)s")
+logging.getLogger("rag").setLevel(logging.INFO)
+
 categories = {
     "A) Single-Department Questions": [
         "What are the mandatory courses offered in the 1st year fall semester of Software Engineering?",
@@ -85,107 +90,104 @@ categories = {
     ]
 }
 
-def run_tests():
-    if not os.path.exists("./ieu_course_db"):
-        sys.exit()
+def load_results(jsonl_filename):
+    answered = {}
+    if not os.path.exists(jsonl_filename):
+        return answered
+    with open(jsonl_filename, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue
+            answered[(record["category"], record["question"])] = record["answer"]
+    return answered
 
-    embeddings = OpenAIEmbeddings(model="text-embedding-3-small")
-    vector_store = Chroma(persist_directory="./ieu_course_db", embedding_function=embeddings)
-
-    retriever = vector_store.as_retriever(
-        search_type="similarity",
-        search_kwargs={'k': 150}
-    )
-    
-    llm = ChatOpenAI(model="gpt-4o-mini", temperature=0)
-
-    template = """You are an expert academic advisor for Izmir University of Economics.
-    You have access to a comprehensive list of course data below.
-    
-    Your goal is to answer the student's question by analyzing the provided Context.
-    
-    INSTRUCTIONS FOR DIFFERENT QUESTION TYPES:
-    
-    1. SPECIFIC COURSE DETAILS (e.g., "Objective of SE 311"):
-       - Search specifically for the block starting with "Code: SE 311".
-       - Do not confuse it with other courses that list SE 311 as a prerequisite.
-       - Extract the requested info (Objective, ECTS, etc.) accurately.
-
-    2. SEMESTER LISTING (e.g., "1st Semester courses"):
-       - Scan all courses in the context.
-       - Identify courses where the 'Semester' field explicitly matches the requested period (e.g., "1. Semester", "1. Year Fall").
-       - List all matching courses found.
-
-    3. COUNTING/QUANTITATIVE (e.g., "How many elective courses..."):
-       - Manually count the entries in the context that meet the criteria.
-       - Provide the final count and list a few examples.
-
-    4. COMPARISON (e.g., "Compare Math requirements of CE vs EEE"):
-       - Find the math courses for both departments in the context.
-       - Analyze and explain the differences or similarities.
-
-    5. TOPIC SEARCH (e.g., "Courses about Mechanics"):
-       - Scan descriptions and topics for the keyword.
-       - List the courses that contain this content.
-
-    If you absolutely cannot find the answer in the context after a thorough search, state "I don't have information about that."
-
-    Context:
-    {context}
-
-    Question: {question}
-
-    Answer:
-    """
-    prompt = PromptTemplate.from_template(template)
-
-    def format_docs(docs):
-        return "\n--- ENTRY ---\n".join(doc.page_content for doc in docs)
-
-    rag_chain = (
-        {"context": retriever | format_docs, "question": RunnablePassthrough()}
-        | prompt
-        | llm
-        | StrOutputParser()
-    )
-
-    json_filename = "test_results.json"
-    
+def export_results(answered, json_filename):
     final_results = {}
-    if os.path.exists(json_filename):
-        with open(json_filename, "r", encoding="utf-8") as f:
-            try:
-                final_results = json.load(f)
-            except:
-                final_results = {}
+    for category_name, questions_list in categories.items():
+        final_results[category_name] = {q: answered[(category_name, q)] for q in questions_list if (category_name, q) in answered}
+    with open(json_filename, "w", encoding="utf-8") as f:
+        json.dump(final_results, f, ensure_ascii=False, indent=4)
+
+async def ask_all(rag_chain, pending, jsonl_filename, answered, workers):
+    semaphore = asyncio.Semaphore(workers)
+    total_questions = len(pending)
+    done = 0
+
+    with open(jsonl_filename, "a", encoding="utf-8") as out:
+        async def ask(category_name, q):
+            nonlocal done
+            async with semaphore:
+                start = time.perf_counter()
+                try:
+                    answer = await rag_chain.ainvoke(q)
+                except Exception as e:
+                    answer = f"ERROR: {str(e)}"
+                elapsed = time.perf_counter() - start
+
+            request = last_request.get() or {}
+            record = {"category": category_name, "question": q, "answer": answer, "seconds": round(elapsed, 3),
+                      "route": request.get("route"), "llm_source": request.get("llm_source")}
+            out.write(json.dumps(record, ensure_ascii=False) + "\n")
+            out.flush()
+            answered[(category_name, q)] = answer
+            done += 1
+            print(f"[{done}/{total_questions}] ({elapsed:.1f}s) {q}")
+
+        await asyncio.gather(*(ask(category_name, q) for category_name, q in pending))
 
-    total_questions = sum(len(q_list) for q_list in categories.values())
-    current_count = 0
+def run_tests():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--results", default="test_results.jsonl")
+    parser.add_argument("--output", default="test_results.json")
+    parser.add_argument("--fresh", action="store_true")
+    parser.add_argument("--retry-errors", action="store_true")
+    parser.add_argument("--metrics", default="rag_metrics.json")
+    parser.add_argument("--vector-store", choices=["chroma", "flat"], help="defaults to RAG_VECTOR_STORE or chroma")
+    parser.add_argument("--metrics-port", type=int)
+    parser.add_argument("--llm-deadline", type=float, default=30.0, help="seconds allowed per answer before falling back to the cheaper model")
+    parser.add_argument("--no-fallback", action="store_true", help="record an error instead of answering with the cheaper model when the deadline is missed")
+    parser.add_argument("--depth", choices=["fixed", "adaptive"], help="retrieval depth; defaults to RAG_RETRIEVAL_DEPTH or fixed")
+    args = parser.parse_args()
+
+    if not os.path.exists(DB_DIR):
+        sys.exit()
 
-    print(f"Starting Categorized Test for {total_questions} questions...\n")
+    if args.fresh and os.path.exists(args.results):
+        os.remove(args.results)
+    answered = load_results(args.results)
 
+    pending = []
     for category_name, questions_list in categories.items():
-        print(f"--- Processing: {category_name} ---")
-        
-        if category_name not in final_results:
-            final_results[category_name] = {}
-
         for q in questions_list:
-            current_count += 1
-            print(f"[{current_count}/{total_questions}] Asking: {q}")
-            
-            try:
-                answer = rag_chain.invoke(q)
-                final_results[category_name][q] = answer
-            except Exception as e:
-                final_results[category_name][q] = f"ERROR: {str(e)}"
-
-            with open(json_filename, "w", encoding="utf-8") as f:
-                json.dump(final_results, f, ensure_ascii=False, indent=4)
-        
-        print(f"--- Completed: {category_name} ---\n")
-            
-    print(f"All tests finished! Results saved to '{json_filename}'.")
+            answer = answered.get((category_name, q))
+            if answer is None or (args.retry_errors and answer.startswith("ERROR:")):
+                pending.append((category_name, q))
+
+    total_questions = sum(len(q_list) for q_list in categories.values())
+    print(f"Starting Categorized Test for {total_questions} questions "
+          f"({total_questions - len(pending)} already answered, {args.workers} workers)...\n")
+
+    vector_store = load_vector_store(store=args.vector_store)
+    llm = make_chat_model(fallback_model=None if args.no_fallback else FALLBACK_MODEL, deadline=args.llm_deadline)
+    rag_chain = build_rag_chain(vector_store, llm, separator="\n--- ENTRY ---\n", depth=args.depth)
+    if args.metrics_port:
+        registry.serve(port=args.metrics_port)
+
+    start = time.perf_counter()
+    if pending:
+        prefetched = rag_chain.prefetch([q for _, q in pending])
+        print(f"Prefetched retrieval for {prefetched} questions in one batch ({time.perf_counter() - start:.2f}s)\n")
+        asyncio.run(ask_all(rag_chain, pending, args.results, answered, args.workers))
+    export_results(answered, args.output)
+
+    vector_store.embeddings.report()
+    llm.client.report()
+    registry.report()
+    registry.write(args.metrics)
+    print(f"All tests finished in {time.perf_counter() - start:.1f}s! Results saved to '{args.output}'.")
 
 if __name__ == "__main__":
-    run_tests()
\ No newline at end of file
+    run_tests()
@@ -0,0 +1,54 @@
+import json
+import os
+import sys
+import threading
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from fake_ects_server import make_server
+import fake_openai_server
+
+COURSES_FILE = os.path.join(ROOT, "ieu_courses_final.json")
+
+
+@pytest.fixture
+def courses():
+    with open(COURSES_FILE, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+@pytest.fixture
+def ects_server():
+    servers = []
+
+    def start(latency=0.0, fail_rate=0.0):
+        server = make_server(COURSES_FILE, port=0, latency=latency, fail_rate=fail_rate)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        servers.append(server)
+        return f"http://127.0.0.1:{server.server_address[1]}/new/"
+
+    yield start
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+
+
+@pytest.fixture
+def openai_server(monkeypatch):
+    servers = []
+
+    def start(**options):
+        server = fake_openai_server.make_server(port=0, **options)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        servers.append(server)
+        monkeypatch.setenv("OPENAI_BASE_URL", f"http://127.0.0.1:{server.server_address[1]}/v1")
+        monkeypatch.setenv("OPENAI_API_KEY", "key")
+        return server
+
+    yield start
+    for server in servers:
+        server.shutdown()
+        server.server_close()
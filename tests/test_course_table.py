@@ -0,0 +1,37 @@
+import pytest
+
+from conftest import COURSES_FILE
+from course_table import CourseTable
+
+
+@pytest.fixture(scope="module")
+def table():
+    return CourseTable.from_file(COURSES_FILE)
+
+
+@pytest.mark.parametrize("question", [
+    "How many Software Engineering courses are not elective?",
+    "How many Software Engineering courses do not have prerequisites?",
+    "How many courses have no prerequisites in the 2nd year fall of Computer Engineering?",
+    "How many courses include 'Java' in their weekly topics?",
+    "Count the courses about electronics.",
+    "How many courses cover 'Optimization'?",
+    "How many courses are called 'Quantum Thermodynamics'?",
+])
+def test_unmodelled_questions_fall_back_to_retrieval(table, question):
+    assert table.parse_query(question) is None
+    assert table.answer(question) is None
+
+
+def test_counting_questions_use_the_table(table):
+    assert table.parse_query("How many elective courses must a Software Engineering student take in the 4. Year Fall Semester?") == {
+        "dept": ["Software Engineering"], "year": 4, "term": "Fall", "types": ["Elective", "Elective - Placeholder"]}
+    assert table.parse_query("How many different 'SFL' courses are listed in the database?") == {"prefix": "SFL"}
+    assert table.parse_query("How many ECTS credits is the 'Introduction to Programming' course?") == {
+        "name": "Introduction to Programming"}
+
+
+def test_quoted_course_name_counts_matching_rows(table):
+    answer = table.answer("How many ECTS credits is the 'Introduction to Programming' course?")
+    assert answer.startswith("Structured result")
+    assert "Matching rows: 0" not in answer
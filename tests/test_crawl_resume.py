@@ -0,0 +1,55 @@
+import json
+import os
+import subprocess
+import sys
+import time
+
+from conftest import ROOT
+from snapshot_archive import SnapshotReader
+
+
+def crawl_command(base_url, *extra):
+    return [sys.executable, os.path.join(ROOT, "web_scraping.py"), "--base-url", base_url, "--rate", "0", "--workers", "4",
+            "--output", "out.json", "--records", "records.jsonl", "--frontier", "frontier.json",
+            "--archive", "snapshots.zip", "--cache-dir", "cache", *extra]
+
+
+def canonical(courses):
+    return sorted(json.dumps(c, ensure_ascii=False, sort_keys=True) for c in courses)
+
+
+def count_lines(path):
+    if not os.path.exists(path):
+        return 0
+    with open(path, "rb") as f:
+        return f.read().count(b"\n")
+
+
+def test_killed_crawl_resumes_with_full_archive(ects_server, courses, tmp_path):
+    base_url = ects_server(latency=0.02)
+    crawl = subprocess.Popen(crawl_command(base_url), cwd=tmp_path, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    deadline = time.monotonic() + 60
+    while count_lines(tmp_path / "records.jsonl") < 50 and crawl.poll() is None and time.monotonic() < deadline:
+        time.sleep(0.01)
+    crawl.kill()
+    crawl.wait()
+    assert 0 < count_lines(tmp_path / "records.jsonl") < len(courses)
+    assert not os.path.exists(tmp_path / "out.json")
+
+    resumed = subprocess.run(crawl_command(base_url, "--resume"), cwd=tmp_path, capture_output=True, text=True)
+    assert resumed.returncode == 0, resumed.stderr
+    assert "Resuming:" in resumed.stdout
+    with open(tmp_path / "out.json", "r", encoding="utf-8") as f:
+        assert canonical(json.load(f)) == canonical(courses)
+
+    reader = SnapshotReader(str(tmp_path / "snapshots.zip"))
+    assert reader.manifest["complete"]
+    reader.close()
+    assert not os.path.exists(tmp_path / "snapshots.zip.journal")
+
+    os.remove(tmp_path / "out.json")
+    parsed = subprocess.run(crawl_command(base_url, "--parse-only", "--timings", "timings.json"), cwd=tmp_path,
+                            capture_output=True, text=True)
+    assert parsed.returncode == 0, parsed.stderr
+    with open(tmp_path / "out.json", "r", encoding="utf-8") as f:
+        assert canonical(json.load(f)) == canonical(courses)
@@ -0,0 +1,62 @@
+import numpy as np
+import pytest
+from langchain_core.embeddings import DeterministicFakeEmbedding
+
+from embedding_cache import CachedEmbeddings
+
+TEXTS = [f"course text {i}" for i in range(10)]
+
+
+class CountingEmbeddings(DeterministicFakeEmbedding):
+    calls: int = 0
+
+    def embed_documents(self, texts):
+        self.calls += 1
+        return super().embed_documents(texts)
+
+
+@pytest.fixture
+def filled(tmp_path):
+    cache = CachedEmbeddings(CountingEmbeddings(size=8), "fake-model", str(tmp_path))
+    vectors = cache.embed_documents(TEXTS)
+    cache.flush()
+    return cache, vectors
+
+
+def reopen(cache):
+    inner = CountingEmbeddings(size=8)
+    return CachedEmbeddings(inner, cache.model_name, cache.vectors_path.rsplit("/", 1)[0]), inner
+
+
+def test_reload_serves_saved_vectors(filled):
+    cache, vectors = filled
+    reopened, inner = reopen(cache)
+    assert reopened.count == len(TEXTS)
+    assert reopened.embed_documents(TEXTS) == vectors
+    assert inner.calls == 0
+
+
+def test_matrix_saved_without_its_index_is_truncated(filled):
+    cache, vectors = filled
+    rows_before = dict(cache.rows)
+    cache.embed_documents(["one more text"])
+    np.save(cache.vectors_path, cache.vectors[:cache.count])
+    reopened, inner = reopen(cache)
+    assert reopened.rows == rows_before and reopened.count == len(TEXTS)
+    assert reopened.embed_documents(TEXTS) == vectors
+    assert inner.calls == 0
+
+
+@pytest.mark.parametrize("damage", [
+    lambda v: v[::-1],
+    lambda v: v[:-3],
+    lambda v: v[:, :4],
+    lambda v: v.astype(np.float64),
+])
+def test_mismatched_matrix_is_discarded(filled, damage):
+    cache, vectors = filled
+    np.save(cache.vectors_path, damage(np.load(cache.vectors_path)))
+    reopened, inner = reopen(cache)
+    assert reopened.count == 0 and reopened.rows == {}
+    assert reopened.embed_documents(TEXTS) == vectors
+    assert inner.calls == 1
@@ -0,0 +1,30 @@
+import pytest
+import requests
+
+from fetcher import Fetcher
+
+DEPARTMENT = "akademik.php?section=se.cs.ieu.edu.tr&sid=curr_before_2025&lang=en"
+
+
+def test_fetch_retries_until_success(ects_server):
+    base_url = ects_server(fail_rate=0.5)
+    fetcher = Fetcher(max_workers=4, requests_per_second=0, max_retries=30, backoff=0.001)
+    try:
+        pages = [f.result() for f in [fetcher.submit(fetcher.fetch, base_url + DEPARTMENT) for _ in range(8)]]
+    finally:
+        fetcher.close()
+    assert all(b"<table>" in page for page in pages)
+    assert fetcher.stats["retries"] > 0
+    assert fetcher.stats["requests"] == 8 + fetcher.stats["retries"]
+    assert fetcher.stats["failures"] == 0
+
+
+def test_fetch_gives_up_after_max_retries(ects_server):
+    base_url = ects_server(fail_rate=1.0)
+    fetcher = Fetcher(requests_per_second=0, max_retries=2, backoff=0.001)
+    try:
+        with pytest.raises(requests.HTTPError):
+            fetcher.fetch(base_url + DEPARTMENT)
+    finally:
+        fetcher.close()
+    assert fetcher.stats == {"requests": 3, "retries": 2, "failures": 1}
@@ -0,0 +1,46 @@
+import numpy as np
+import pytest
+
+import flat_index
+from flat_index import FlatIndex, export_flat_index, normalize_rows
+
+
+class FakeStore:
+    def __init__(self, vectors):
+        self.vectors = vectors
+
+    def get(self, include=None):
+        return {"ids": [f"doc-{i:04d}" for i in range(len(self.vectors))],
+                "embeddings": self.vectors.tolist(),
+                "documents": [f"text {i}" for i in range(len(self.vectors))],
+                "metadatas": [{"code": f"C {i % 7}"} for i in range(len(self.vectors))]}
+
+
+@pytest.fixture(scope="module")
+def vectors():
+    return np.random.default_rng(0).standard_normal((1000, 24)).astype(np.float32)
+
+
+@pytest.mark.parametrize("dtype", ["float16", "int8"])
+def test_blocked_top_k_matches_full_scoring(vectors, tmp_path, monkeypatch, dtype):
+    export_flat_index(FakeStore(vectors), str(tmp_path), "v1")
+    monkeypatch.setattr(flat_index, "SCORE_BLOCK_ROWS", 64)
+    index = FlatIndex(str(tmp_path), embeddings=None, dtype=dtype, version="v1")
+
+    matrix = np.asarray(index.matrix, dtype=np.float32)
+    if index.scales is not None:
+        matrix = matrix * index.scales[:, None]
+    queries = np.random.default_rng(1).standard_normal((5, 24)).astype(np.float32)
+    full = normalize_rows(queries) @ matrix.T
+
+    for query, hits in zip(full, index.top_k_batch(queries, 10)):
+        expected = np.argsort(-query, kind="stable")[:10]
+        assert [i for i, _ in hits] == expected.tolist()
+        assert np.allclose([s for _, s in hits], query[expected], atol=1e-5)
+
+    masked = np.where(index.mask({"code": {"$in": ["C 3"]}}), full[0], -np.inf)
+    hits = index.top_k(queries[0], 10, filter={"code": {"$in": ["C 3"]}})
+    assert [i for i, _ in hits] == np.argsort(-masked, kind="stable")[:10].tolist()
+    assert all(index.metadatas[i]["code"] == "C 3" for i, _ in hits)
+    assert not any(isinstance(value, np.ndarray) and value.dtype == np.float32 and value.size >= matrix.size
+                   for value in vars(index).values())
@@ -0,0 +1,52 @@
+import json
+
+from fetcher import Fetcher
+from http_cache import HttpCache
+
+DETAIL = "syllabus.php?section=se.cs.ieu.edu.tr&course_code=SE 311&cer=0"
+
+
+def fetch_twice(base_url, cache):
+    fetcher = Fetcher(requests_per_second=0, cache=cache)
+    try:
+        first = fetcher.fetch(base_url + DETAIL)
+        second = fetcher.fetch(base_url + DETAIL)
+    finally:
+        fetcher.close()
+    return fetcher, first, second
+
+
+def test_second_fetch_revalidates_with_304(ects_server, tmp_path):
+    cache = HttpCache(str(tmp_path))
+    fetcher, first, second = fetch_twice(ects_server(), cache)
+    assert b"SE 311" in first
+    assert second == first
+    assert fetcher.stats["requests"] == 2
+    assert cache.stats["miss"] == 1 and cache.stats["revalidated"] == 1
+
+
+def test_fresh_entries_skip_the_network(ects_server, tmp_path):
+    cache = HttpCache(str(tmp_path), max_age_hours=1)
+    fetcher, first, second = fetch_twice(ects_server(), cache)
+    assert second == first
+    assert fetcher.stats["requests"] == 1
+    assert cache.stats["fresh"] == 1
+
+
+def test_changed_etag_with_same_body_is_unchanged(ects_server, tmp_path):
+    base_url = ects_server()
+    cache = HttpCache(str(tmp_path))
+    fetcher = Fetcher(requests_per_second=0, cache=cache)
+    try:
+        body = fetcher.fetch(base_url + DETAIL)
+        meta_path, _ = cache.paths(base_url + DETAIL)
+        with open(meta_path, "r", encoding="utf-8") as f:
+            meta = json.load(f)
+        with open(meta_path, "w", encoding="utf-8") as f:
+            json.dump(dict(meta, etag='"stale"'), f)
+        assert fetcher.fetch(base_url + DETAIL) == body
+    finally:
+        fetcher.close()
+    assert cache.stats["unchanged"] == 1
+    with open(meta_path, "r", encoding="utf-8") as f:
+        assert json.load(f)["etag"] == meta["etag"]
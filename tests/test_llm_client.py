@@ -0,0 +1,79 @@
+import asyncio
+import time
+
+import pytest
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.output_parsers import StrOutputParser
+
+from answer_cache import SourceCallback
+from llm_client import LLMDeadlineExceeded, make_chat_model
+from rag_metrics import InstrumentedChain, last_request
+
+PRIMARY = "primary-model"
+CHEAP = "cheap-model"
+
+
+class EndCounter(BaseCallbackHandler):
+    def __init__(self):
+        self.ends = 0
+
+    def on_llm_end(self, response, **kwargs):
+        self.ends += 1
+
+
+def ask(chain, question, callbacks):
+    async def run():
+        answer = await chain.ainvoke(question, {"callbacks": callbacks})
+        return answer, last_request.get()
+    return asyncio.run(run())
+
+
+def test_hedged_call_reports_one_llm_run(openai_server):
+    server = openai_server(ttft=0.1, token_delay=0.005)
+    llm = make_chat_model(PRIMARY, CHEAP, initial_hedge_delay=0.02)
+    chain = InstrumentedChain(llm | StrOutputParser())
+    ends, sources = EndCounter(), SourceCallback()
+    answer, request = ask(chain, "hello", [ends, sources])
+
+    assert answer.startswith(f"This is a fake answer from {PRIMARY}")
+    assert ends.ends == 1
+    assert sources.sources in (["primary"], ["hedge"])
+    assert request["llm_hedged"] is True
+    assert request["stages_ms"]["llm_ttft"] <= request["stages_ms"]["llm"] <= request["stages_ms"]["total"]
+    assert llm.client.stats["hedges"] == 1 and llm.client.stats["cancelled"] == 1
+    deadline = time.monotonic() + 5
+    while server.state.stats["cancelled_streams"] < 1 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert server.state.stats["chat_requests"] == 2
+    assert server.state.stats["cancelled_streams"] == 1
+
+
+def test_stalled_primary_falls_back_to_cheaper_model(openai_server):
+    openai_server(stall_rate=1.0, stall_seconds=5.0, stall_model=PRIMARY)
+    llm = make_chat_model(PRIMARY, CHEAP, deadline=2.0, ttft_timeout=0.3, initial_hedge_delay=0.1)
+    chain = InstrumentedChain(llm | StrOutputParser())
+    ends, sources = EndCounter(), SourceCallback()
+    start = time.perf_counter()
+    answer, request = ask(chain, "hello", [ends, sources])
+
+    assert time.perf_counter() - start < 2.0
+    assert answer.startswith(f"This is a fake answer from {CHEAP}")
+    assert request["llm_source"] == "fallback_model"
+    assert sources.sources == ["fallback_model"]
+    assert not sources.cacheable()
+    assert ends.ends == 1
+    assert llm.client.stats["deadline_misses"] == 1 and llm.client.stats["fallback_model"] == 1
+
+
+def test_stalled_primary_replays_cached_answer_without_fallback(openai_server):
+    server = openai_server()
+    llm = make_chat_model(PRIMARY, None, deadline=2.0, ttft_timeout=0.3, max_hedges=0)
+    first = llm.invoke("hello")
+    server.state.stall_rate, server.state.stall_seconds = 1.0, 5.0
+    second = llm.invoke("hello")
+
+    assert second.content == first.content
+    assert second.response_metadata["llm_source"] == "cached"
+    with pytest.raises(LLMDeadlineExceeded):
+        llm.invoke("a question never answered before")
+    assert llm.client.stats["cached"] == 1 and llm.client.stats["errors"] == 1
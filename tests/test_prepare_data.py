@@ -0,0 +1,28 @@
+import json
+import os
+
+from conftest import COURSES_FILE
+from prepare_data import load_entities
+
+
+def test_entities_are_rebuilt_when_source_content_changes(tmp_path):
+    source = tmp_path / "courses.json"
+    entities_file = str(tmp_path / "entities.json")
+    with open(COURSES_FILE, "r", encoding="utf-8") as f:
+        courses = json.load(f)[:20]
+    source.write_text(json.dumps(courses), encoding="utf-8")
+    first = load_entities(str(source), entities_file)
+    assert load_entities(str(source), entities_file) == first
+
+    stat = os.stat(source)
+    name = courses[0]["course_name"]
+    courses[0]["course_name"] = name[::-1]
+    source.write_text(json.dumps(courses), encoding="utf-8")
+    os.utime(source, ns=(stat.st_atime_ns, stat.st_mtime_ns - 10 ** 9))
+    assert os.path.getsize(source) == stat.st_size
+    assert os.path.getmtime(source) < os.path.getmtime(entities_file)
+
+    rebuilt = load_entities(str(source), entities_file)
+    assert rebuilt[0]["course_name"] == name[::-1]
+    with open(entities_file, "r", encoding="utf-8") as f:
+        assert json.load(f)["entities"] == rebuilt
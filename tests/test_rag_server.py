@@ -0,0 +1,110 @@
+import asyncio
+import json
+
+from langchain_core.output_parsers import StrOutputParser
+
+from rag_server import MAX_BATCH, RagServer
+
+
+class FakeChain:
+    def __init__(self, server):
+        self.server = server
+        self.llm = server.make_llm() | StrOutputParser()
+        self.peak = 0
+
+    def prefetch(self, questions):
+        return len(questions)
+
+    async def ainvoke(self, question):
+        self.peak = max(self.peak, self.server.stats["in_flight"])
+        return await self.llm.ainvoke(question)
+
+
+class FakeRagServer(RagServer):
+    def build(self):
+        return FakeChain(self)
+
+
+async def start(**options):
+    server = FakeRagServer(fake_llm=True, fake_llm_delay=0.002, **options)
+    server.slots = asyncio.Semaphore(server.max_in_flight)
+    listener = await asyncio.start_server(server.handle, "127.0.0.1", 0)
+    await server.load()
+    return server, listener, listener.sockets[0].getsockname()[1]
+
+
+async def post(port, path, payload):
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    body = json.dumps(payload).encode("utf-8")
+    writer.write(f"POST {path} HTTP/1.1\r\nContent-Length: {len(body)}\r\n\r\n".encode("latin-1") + body)
+    await writer.drain()
+    response = await reader.read()
+    writer.close()
+    head, _, payload = response.partition(b"\r\n\r\n")
+    return int(head.split()[1]), json.loads(payload)
+
+
+async def wait_for_queue(server, queued):
+    while server.stats["queued"] < queued:
+        await asyncio.sleep(0.001)
+
+
+def questions(n, prefix="q"):
+    return [f"{prefix}{i}" for i in range(n)]
+
+
+def test_batch_questions_share_the_server_slots():
+    async def run():
+        server, listener, port = await start(max_in_flight=2, max_queue=8)
+        status, result = await post(port, "/ask/batch", {"questions": questions(6)})
+        listener.close()
+        return server, status, result
+
+    server, status, result = asyncio.run(run())
+    assert status == 200
+    assert [a["question"] for a in result["answers"]] == questions(6)
+    assert all(a["answer"].startswith("This is a canned answer") for a in result["answers"])
+    assert result["prefetched"] == 6
+    assert server.chain.peak == 2
+    assert server.stats == {"in_flight": 0, "queued": 0, "served": 6, "rejected": 0, "errors": 0}
+
+
+def test_batch_larger_than_free_slots_and_queue_is_rejected():
+    async def run():
+        server, listener, port = await start(max_in_flight=2, max_queue=2)
+        too_many = await post(port, "/ask/batch", {"questions": questions(5)})
+        fits = await post(port, "/ask/batch", {"questions": questions(4)})
+        listener.close()
+        return server, too_many, fits
+
+    server, too_many, fits = asyncio.run(run())
+    assert too_many[0] == 503
+    assert fits[0] == 200
+    assert server.stats["rejected"] == 1 and server.stats["served"] == 4
+
+
+def test_batch_waits_behind_queued_questions():
+    async def run():
+        server, listener, port = await start(max_in_flight=2, max_queue=2)
+        first = asyncio.ensure_future(post(port, "/ask/batch", {"questions": questions(4, "a")}))
+        await asyncio.wait_for(wait_for_queue(server, 2), 5)
+        second = await post(port, "/ask/batch", {"questions": ["b0"]})
+        first = await first
+        listener.close()
+        return server, first, second
+
+    server, first, second = asyncio.run(run())
+    assert second[0] == 503
+    assert first[0] == 200 and len(first[1]["answers"]) == 4
+    assert server.stats["in_flight"] == 0 and server.stats["queued"] == 0
+
+
+def test_batch_validation():
+    async def run():
+        server, listener, port = await start()
+        results = [await post(port, "/ask/batch", payload)
+                   for payload in ({"questions": []}, {"questions": ["ok", " "]}, {"questions": questions(MAX_BATCH + 1)})]
+        listener.close()
+        return results
+
+    assert [status for status, _ in asyncio.run(run())] == [400, 400, 413]
@@ -2,53 +2,124 @@ import json
 import os
 import sys
 import shutil
-from langchain_openai import OpenAIEmbeddings
+import hashlib
+import time
 from langchain_chroma import Chroma
-from langchain_core.documents import Document
+from bm25_index import BM25Index
+from chunking import chunk_documents
+from embedding_backends import backend_name, configured_backend, index_backend, make_embeddings
+from flat_index import export_flat_index, flat_index_exists
+from prepare_data import COURSES_FILE, load_entities
+from prereq_graph import PREREQ_FILE, PrereqGraph
 
 os.environ["OPENAI_API_KEY"] = "key"
 
 if "OPENAI_API_KEY" not in os.environ:
     sys.exit()
 
+DB_DIR = "./ieu_course_db"
+STAGING_DIR = "./ieu_course_db.staging"
+MANIFEST_FILE = "index_manifest.json"
+BM25_FILE = "bm25_index.json"
+
+EMBED_BATCH_TOKENS = 8000
+EMBED_CONCURRENCY = 4
+EMBED_TOKENS_PER_MINUTE = 1000000
+
+def indexed_hashes(store):
+    existing = store.get(include=["metadatas"])
+    return {doc_id: (meta or {}).get("content_hash") for doc_id, meta in zip(existing["ids"], existing["metadatas"])}
+
+def index_version(hashes):
+    digest = hashlib.sha256()
+    for doc_id in sorted(hashes):
+        digest.update(f"{doc_id}={hashes[doc_id]}\n".encode("utf-8"))
+    return digest.hexdigest()
+
+def read_manifest(db_dir=DB_DIR):
+    path = os.path.join(db_dir, MANIFEST_FILE)
+    if not os.path.exists(path):
+        return {}
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+def write_manifest(db_dir, hashes, backend):
+    manifest = {
+        "version": index_version(hashes),
+        "documents": len(hashes),
+        "embedding_backend": backend,
+        "built_at": time.time()
+    }
+    with open(os.path.join(db_dir, MANIFEST_FILE), 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=4)
+    return manifest
+
+def swap_in(staging_dir, db_dir):
+    retired_dir = db_dir + ".old"
+    if os.path.exists(retired_dir):
+        shutil.rmtree(retired_dir)
+    if os.path.exists(db_dir):
+        os.rename(db_dir, retired_dir)
+    os.rename(staging_dir, db_dir)
+    if os.path.exists(retired_dir):
+        shutil.rmtree(retired_dir)
+
 def create_db():
-    if os.path.exists("./ieu_course_db"):
-        shutil.rmtree("./ieu_course_db")
+    if not os.path.exists(COURSES_FILE):
+        return
 
-    if not os.path.exists('ieu_courses_final.json'):
+    documents = chunk_documents(load_entities(COURSES_FILE))
+    wanted = {doc_id: doc.metadata["content_hash"] for doc_id, doc in documents.items()}
+
+    backend = configured_backend()
+    embeddings = make_embeddings(backend, scheduler_options={
+        "max_batch_tokens": EMBED_BATCH_TOKENS,
+        "max_concurrency": EMBED_CONCURRENCY,
+        "tokens_per_minute": EMBED_TOKENS_PER_MINUTE
+    })
+
+    manifest = read_manifest()
+    reuse = os.path.exists(DB_DIR) and index_backend(manifest) == backend_name(backend)
+    if os.path.exists(DB_DIR) and not reuse:
+        print(f"Embedding backend changed ({index_backend(manifest)} -> {backend_name(backend)}), rebuilding all vectors.")
+
+    current = {}
+    if reuse:
+        current = indexed_hashes(Chroma(persist_directory=DB_DIR, embedding_function=embeddings))
+
+    added = [doc_id for doc_id in wanted if doc_id not in current]
+    updated = [doc_id for doc_id in wanted if doc_id in current and current[doc_id] != wanted[doc_id]]
+    deleted = [doc_id for doc_id in current if doc_id not in wanted]
+    skipped = len(wanted) - len(added) - len(updated)
+
+    print(f"Added: {len(added)}, Updated: {len(updated)}, Deleted: {len(deleted)}, Skipped: {skipped}")
+
+    up_to_date = manifest.get("version") == index_version(wanted) and os.path.exists(os.path.join(DB_DIR, BM25_FILE)) and os.path.exists(os.path.join(DB_DIR, PREREQ_FILE)) and flat_index_exists(DB_DIR)
+    if not (added or updated or deleted) and up_to_date:
+        print("Database is up to date.")
+        embeddings.report()
         return
 
-    with open('ieu_courses_final.json', 'r', encoding='utf-8') as f:
-        data = json.load(f)
-
-    documents = []
-    for course in data:
-        content = (
-            f"Code: {course.get('course_code', '')}\n"
-            f"Name: {course.get('course_name', '')}\n"
-            f"Semester: {course.get('semester', '')}\n"
-            f"Dept: {course.get('department', '')}\n"
-            f"Type: {course.get('type', '')}\n"
-            f"Prerequisites: {course.get('prerequisites', '')}\n"
-            f"ECTS: {course.get('ects', '')}\n"
-            f"Desc: {course.get('description', '')}\n"
-            f"Topics: {course.get('weekly_topics', '')}"
-        )
-        meta = {
-            "code": course.get('course_code', 'Unknown'),
-            "dept": course.get('department', 'Unknown')
-        }
-        documents.append(Document(page_content=content, metadata=meta))
-
-    embeddings = OpenAIEmbeddings(model="text-embedding-3-small")
-    
-    Chroma.from_documents(
-        documents=documents,
-        embedding=embeddings,
-        persist_directory="./ieu_course_db"
-    )
+    if os.path.exists(STAGING_DIR):
+        shutil.rmtree(STAGING_DIR)
+    if reuse:
+        shutil.copytree(DB_DIR, STAGING_DIR)
+
+    staging = Chroma(persist_directory=STAGING_DIR, embedding_function=embeddings)
+    if deleted:
+        staging.delete(ids=deleted)
+    changed = added + updated
+    if changed:
+        staging.add_documents(documents=[documents[doc_id] for doc_id in changed], ids=changed)
+
+    BM25Index.from_documents(documents.values(), documents.keys()).save(os.path.join(STAGING_DIR, BM25_FILE))
+    PrereqGraph.from_file(COURSES_FILE).save(os.path.join(STAGING_DIR, PREREQ_FILE))
+    manifest = write_manifest(STAGING_DIR, indexed_hashes(staging), backend_name(backend))
+    export_flat_index(staging, STAGING_DIR, manifest["version"])
+    swap_in(STAGING_DIR, DB_DIR)
 
+    embeddings.report()
     print("Database created.")
 
 if __name__ == "__main__":
-    create_db()
\ No newline at end of file
+    create_db()
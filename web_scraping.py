@@ -1,8 +1,16 @@
-import requests
+import argparse
 from bs4 import BeautifulSoup
 import json
-import time
 import re
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from fetcher import Fetcher
+from http_cache import HttpCache
+from crawl_checkpoint import CrawlCheckpoint
+from snapshot_archive import SnapshotReader, SnapshotWriter, open_worker_reader, read_snapshot
+
+BASE_URL = "https://ects.ieu.edu.tr/new/"
 
 departments = [
     {
@@ -27,22 +35,65 @@ departments = [
     }
 ]
 
-all_courses_data = []
+detail_futures = {}
+pool_pages = {}
+checkpoint = None
+fetcher = None
+archive = None
+parsed_details = None
+base_url = BASE_URL
 
-def get_course_details(course_url):
-    course_info = {
+def resolve_url(url):
+    if not url.startswith("http"):
+        return base_url + url
+    return url
+
+def queue_course(course_obj, detail_url=None, adjust=None):
+    if checkpoint.seen(course_obj["department"], course_obj["course_code"]):
+        return False
+
+    details = None
+    if detail_url:
+        detail_url = resolve_url(detail_url)
+        if detail_url not in detail_futures:
+            detail_futures[detail_url] = fetcher.submit(get_course_details, detail_url)
+        details = detail_futures[detail_url]
+    return checkpoint.add(course_obj, details, adjust)
+
+def fetch_page(url, kind):
+    body = fetcher.fetch(url)
+    if archive: archive.add(url, kind, body)
+    return body
+
+def empty_course_info():
+    return {
         "objectives": "Not specified",
         "description": "Not specified",
         "prerequisites": "None",
         "weekly_topics": []
     }
-    
+
+def get_course_details(course_url):
+    course_url = resolve_url(course_url)
+
+    if parsed_details is not None:
+        details = parsed_details.get(course_url)
+        if details is None:
+            fetcher.missing += 1
+            details = empty_course_info()
+        return dict(details, weekly_topics=list(details["weekly_topics"]))
+
     try:
-        if not course_url.startswith("http"):
-            course_url = "https://ects.ieu.edu.tr/new/" + course_url
+        html = fetch_page(course_url, "detail")
+    except Exception as e:
+        return empty_course_info()
+    return parse_course_details(html)
 
-        response = requests.get(course_url)
-        soup = BeautifulSoup(response.content, 'html.parser')
+def parse_course_details(html):
+    course_info = empty_course_info()
+    
+    try:
+        soup = BeautifulSoup(html, 'html.parser')
 
         all_rows = soup.find_all('tr')
         for row in all_rows:
@@ -91,11 +142,14 @@ def scrape_pool_page(pool_url, target_id_str, dept_name, source_code, label_type
     print(f"  -> Entering Pool Page... Filtering ONLY for Section ID: {target_id_str}")
     
     try:
-        if not pool_url.startswith("http"):
-            pool_url = "https://ects.ieu.edu.tr/new/" + pool_url
-            
-        response = requests.get(pool_url)
-        soup = BeautifulSoup(response.content, 'html.parser')
+        pool_url = resolve_url(pool_url)
+        if checkpoint.page_done(dept_name, pool_url):
+            print(f"    -> Pool already saved, skipping: {target_id_str}")
+            return
+
+        if pool_url not in pool_pages:
+            pool_pages[pool_url] = fetch_page(pool_url, "pool")
+        soup = BeautifulSoup(pool_pages[pool_url], 'html.parser')
         tables = soup.find_all('table')
 
         collecting = False
@@ -126,16 +180,7 @@ def scrape_pool_page(pool_url, target_id_str, dept_name, source_code, label_type
                             p_ects = cols[-1].text.strip()
                             
                             p_link = cols[0].find('a')
-                            p_details = {"objectives": "", "description": f"{label_type} Course", "prerequisites": "", "weekly_topics": []}
-                            p_url = ""
-                            
-                            if p_link:
-                                p_url = p_link['href']
-                                fetched_details = get_course_details(p_url)
-                                p_details["objectives"] = fetched_details["objectives"]
-                                p_details["description"] = fetched_details["description"] + f" [Source: Pool {target_id_str}]"
-                                p_details["prerequisites"] = fetched_details["prerequisites"]
-                                p_details["weekly_topics"] = fetched_details["weekly_topics"]
+                            p_url = p_link['href'] if p_link else ""
 
                             pool_obj = {
                                 "department": dept_name,
@@ -145,27 +190,34 @@ def scrape_pool_page(pool_url, target_id_str, dept_name, source_code, label_type
                                 "type": label_type,           
                                 "ects": p_ects,
                                 "local_credit": "-", 
-                                "objectives": p_details["objectives"],
-                                "description": p_details["description"],
-                                "prerequisites": p_details["prerequisites"],
-                                "weekly_topics": p_details["weekly_topics"],
+                                "objectives": "",
+                                "description": f"{label_type} Course",
+                                "prerequisites": "",
+                                "weekly_topics": [],
                                 "url": p_url
                             }
-                            all_courses_data.append(pool_obj)
-                            print(f"    -> Added: {p_code} | {label_type} (Pool {target_id_str})")
+
+                            def add_source(details, pool_id=target_id_str):
+                                details["description"] += f" [Source: Pool {pool_id}]"
+                            if queue_course(pool_obj, p_url, add_source):
+                                print(f"    -> Added: {p_code} | {label_type} (Pool {target_id_str})")
 
                         except: continue
+
+        checkpoint.mark_page(dept_name, pool_url)
     except Exception as e:
         print(f"  ! Pool Error: {e}")
 
 def scrape_department(dept):
     print(f"--- Scanning {dept['name']} ---")
+    if checkpoint.department_done(dept['name']):
+        print("    -> Already saved in a previous run, skipping.")
+        return
     
     processed_pools = set()
 
     try:
-        response = requests.get(dept['url'])
-        soup = BeautifulSoup(response.content, 'html.parser')
+        soup = BeautifulSoup(fetch_page(dept['url'], "department"), 'html.parser')
         
         all_links = soup.find_all('a', href=True)
         lang_pattern = re.compile(r'course_code=(FR|GER|ITL|SPN|RUS|CHN|JPN|GR)\s?(\d+)', re.IGNORECASE)
@@ -176,17 +228,7 @@ def scrape_department(dept):
             if match:
                 lang_code = f"{match.group(1).upper()} {match.group(2)}"
                 
-                lang_url = href
-                if not lang_url.startswith("http"):
-                    lang_url = "https://ects.ieu.edu.tr/new/" + lang_url
-                
-                details = get_course_details(lang_url)
-                
-                extra_note = " This course is available for selection as a Second Foreign Language (SFL) option."
-                if details["description"] == "Not specified":
-                    details["description"] = extra_note
-                else:
-                    details["description"] += extra_note
+                lang_url = resolve_url(href)
                 
                 lang_obj = {
                     "department": dept['name'],
@@ -196,21 +238,21 @@ def scrape_department(dept):
                     "type": "Mandatory",
                     "ects": "2", 
                     "local_credit": "2",
-                    "objectives": details["objectives"],
-                    "description": details["description"],
-                    "prerequisites": details["prerequisites"],
-                    "weekly_topics": details["weekly_topics"],
+                    "objectives": "Not specified",
+                    "description": "Not specified",
+                    "prerequisites": "None",
+                    "weekly_topics": [],
                     "url": lang_url
                 }
                 
-                exists = False
-                for item in all_courses_data:
-                    if item["course_code"] == lang_code and item["department"] == dept['name']:
-                        exists = True
-                        break
+                def add_sfl_note(details):
+                    extra_note = " This course is available for selection as a Second Foreign Language (SFL) option."
+                    if details["description"] == "Not specified":
+                        details["description"] = extra_note
+                    else:
+                        details["description"] += extra_note
                 
-                if not exists:
-                    all_courses_data.append(lang_obj)
+                if queue_course(lang_obj, lang_url, add_sfl_note):
                     print(f"    -> Scraped Language: {lang_code}")
 
         tables = soup.find_all('table')
@@ -298,11 +340,12 @@ def scrape_department(dept):
                                 final_type = "Elective"
 
                         details_data = {"objectives": "", "description": "", "prerequisites": "", "weekly_topics": []}
+                        fetch_details = False
                         
                         if final_type == "Mandatory":
-                             if link_tag: details_data = get_course_details(detail_url)
-                             if hover_text: details_data["description"] += f" [Note: {hover_text}]"
-                             if "SFL" in course_code:
+                             if link_tag: fetch_details = True
+                             elif hover_text: details_data["description"] += f" [Note: {hover_text}]"
+                             if "SFL" in course_code and not link_tag:
                                  details_data["description"] += " Second Foreign Language course. See available language options."
 
                         elif final_type == "Elective - Placeholder":
@@ -311,7 +354,7 @@ def scrape_department(dept):
                              details_data["objectives"] = "Elective Slot"
                              
                         elif final_type == "Elective":
-                             if link_tag: details_data = get_course_details(detail_url)
+                             if link_tag: fetch_details = True
 
                         course_obj = {
                             "department": dept['name'],
@@ -328,21 +371,124 @@ def scrape_department(dept):
                             "url": detail_url
                         }
                         
-                        all_courses_data.append(course_obj)
-                        print(f"Added: {course_code} | {final_type}")
+                        def add_notes(details, hover_text=hover_text, course_code=course_code):
+                            if hover_text: details["description"] += f" [Note: {hover_text}]"
+                            if "SFL" in course_code:
+                                details["description"] += " Second Foreign Language course. See available language options."
+
+                        if fetch_details and final_type == "Mandatory":
+                            added = queue_course(course_obj, detail_url, add_notes)
+                        elif fetch_details:
+                            added = queue_course(course_obj, detail_url)
+                        else:
+                            added = queue_course(course_obj)
+
+                        if added: print(f"Added: {course_code} | {final_type}")
 
                     except Exception as e:
                         continue 
 
+        checkpoint.mark_department(dept['name'])
     except Exception as e:
         print(f"Department Error: {e}")
 
-for dept in departments:
-    scrape_department(dept)
-    time.sleep(1) 
-    
-filename = 'ieu_courses_final.json'
-with open(filename, 'w', encoding='utf-8') as f:
-    json.dump(all_courses_data, f, ensure_ascii=False, indent=4)
+def parse_snapshot(url):
+    start = time.perf_counter()
+    details = parse_course_details(read_snapshot(url))
+    return url, details, time.perf_counter() - start
+
+def parse_archive(reader, processes):
+    global parsed_details
+
+    urls = reader.urls("detail")
+    timings = []
+    parsed_details = {}
+    with ProcessPoolExecutor(max_workers=processes, initializer=open_worker_reader, initargs=(reader.path,)) as pool:
+        for url, details, elapsed in pool.map(parse_snapshot, urls, chunksize=16):
+            parsed_details[url] = details
+            timings.append({"url": url, "kind": "detail", "seconds": elapsed})
+    return timings
+
+def report_timings(timings, filename):
+    timings.sort(key=lambda t: t["seconds"], reverse=True)
+    total = sum(t["seconds"] for t in timings)
+    print(f"\nParsed {len(timings)} pages, {total:.2f}s of parse time. Slowest pages:")
+    for t in timings[:10]:
+        print(f"  {t['seconds'] * 1000:8.1f} ms  {t['kind']:<10} {t['url']}")
+    with open(filename, 'w', encoding='utf-8') as f:
+        json.dump(timings, f, ensure_ascii=False, indent=4)
+
+def main():
+    global fetcher, archive, checkpoint, base_url
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--rate", type=float, default=5.0, help="max requests per second per host")
+    parser.add_argument("--retries", type=int, default=3)
+    parser.add_argument("--base-url", default=BASE_URL, help="e.g. http://127.0.0.1:8000/new/ for a local stand-in server")
+    parser.add_argument("--output", default="ieu_courses_final.json")
+    parser.add_argument("--cache-dir", default="./http_cache")
+    parser.add_argument("--no-cache", action="store_true")
+    parser.add_argument("--max-age", type=float, default=0, help="skip revalidation for pages fetched less than N hours ago")
+    parser.add_argument("--archive", default="ieu_snapshots.zip", help="raw HTML snapshot archive")
+    parser.add_argument("--no-archive", action="store_true")
+    parser.add_argument("--parse-only", action="store_true", help="re-run extraction over the archive without network access")
+    parser.add_argument("--processes", type=int, default=None)
+    parser.add_argument("--timings", default="parse_timings.json")
+    parser.add_argument("--records", default="ieu_courses_final.jsonl", help="append-only per-course output")
+    parser.add_argument("--frontier", default="crawl_frontier.json")
+    parser.add_argument("--resume", action="store_true", help="continue an interrupted run from --records/--frontier")
+    args = parser.parse_args()
+
+    checkpoint = CrawlCheckpoint(args.records, args.frontier, resume=args.resume)
+    if checkpoint.resumed:
+        print(f"Resuming: {checkpoint.resumed} courses already saved, {len(checkpoint.completed_departments)} departments complete.")
+
+    timings = []
+    if args.parse_only:
+        start = time.perf_counter()
+        fetcher = SnapshotReader(args.archive)
+        if not fetcher.manifest.get("complete", True):
+            sys.exit(f"'{args.archive}' is from an interrupted crawl; finish it with --resume before using --parse-only.")
+        base_url = fetcher.manifest["base_url"]
+        timings = parse_archive(fetcher, args.processes)
+    else:
+        base_url = args.base_url
+        cache = None if args.no_cache else HttpCache(args.cache_dir, max_age_hours=args.max_age)
+        fetcher = Fetcher(max_workers=args.workers, requests_per_second=args.rate, max_retries=args.retries, cache=cache)
+        if not args.no_archive:
+            archive = SnapshotWriter(args.archive, base_url, resume=args.resume)
+
+    complete = False
+    try:
+        for dept in departments:
+            dept = dict(dept, url=dept['url'].replace(BASE_URL, base_url))
+            dept_start = time.perf_counter()
+            scrape_department(dept)
+            timings.append({"url": dept['url'], "kind": "department", "seconds": time.perf_counter() - dept_start})
+
+        for future in detail_futures.values():
+            future.result()
+        complete = True
+    finally:
+        fetcher.close()
+        checkpoint.close()
+        if archive: archive.close(complete)
+
+    if args.parse_only and fetcher.missing:
+        fetcher.report()
+        sys.exit(f"'{args.archive}' is missing {fetcher.missing} pages; not writing '{args.output}'.")
+
+    all_courses_data = checkpoint.records()
+    filename = args.output
+    with open(filename, 'w', encoding='utf-8') as f:
+        json.dump(all_courses_data, f, ensure_ascii=False, indent=4)
+
+    fetcher.report()
+    if args.parse_only:
+        report_timings(timings, args.timings)
+        print(f"Parse-only run took {time.perf_counter() - start:.2f}s.")
+    print(f"\nProcess Completed! A total of {len(all_courses_data)} courses have been saved to '{filename}'.")
 
-print(f"\nProcess Completed! A total of {len(all_courses_data)} courses have been saved to '{filename}'.")
\ No newline at end of file
+if __name__ == "__main__":
+    main()